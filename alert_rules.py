@@ -0,0 +1,76 @@
+import re
+from typing import Optional, Tuple
+from config import Config
+
+COOLDOWN_UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+# /alert <coin> <op> <price> [repeat [band[%]] [cooldown<s|m|h|d>]]
+ALERT_PATTERN = re.compile(
+    r"\/alert\s*([\w\s]+?)\s*([<>])\s*(\d*\.?\d+)"
+    r"(?:\s+(repeat)(?:\s+(\d*\.?\d+)\s*%?)?(?:\s+(\d+)\s*([smhd]))?)?\s*$",
+    re.IGNORECASE
+)
+
+ALERT_USAGE = (
+    "❌ Invalid format. Use:\n"
+    "/alert BTC > 100000\n"
+    "/alert ETH < 2000\n"
+    "/alert BTC > 100000 repeat 2%\n"
+    "/alert BTC > 100000 repeat 2% 30m"
+)
+
+
+def format_cooldown(seconds: int) -> str:
+    """Render seconds in the largest whole unit, e.g. 1800 -> '30m'"""
+    for unit, size in reversed(COOLDOWN_UNITS.items()):
+        if seconds and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def parse_alert(text: str) -> Tuple[str, bool, float, Optional[float], int]:
+    """Parse an /alert command into (coin, is_greater_than, price, hysteresis, cooldown).
+
+    Repeating alerts re-arm once the price leaves the hysteresis band and
+    notify again no sooner than the cooldown; one-time alerts have no band
+    and no cooldown. Raises ValueError with the message for the user.
+    """
+    match = ALERT_PATTERN.match(text)
+    if not match:
+        raise ValueError(ALERT_USAGE)
+    coin, operator, price, repeat, band, amount, unit = match.groups()
+
+    hysteresis = None
+    cooldown = 0
+    if repeat:
+        band = float(band) if band else Config.ALERT_HYSTERESIS * 100
+        if not 0 < band <= Config.MAX_ALERT_HYSTERESIS * 100:
+            raise ValueError(f"❌ Repeat band must be between 0% and {Config.MAX_ALERT_HYSTERESIS:.0%}")
+        hysteresis = band / 100
+        cooldown = Config.ALERT_COOLDOWN
+        if amount:
+            cooldown = int(amount) * COOLDOWN_UNITS[unit.lower()]
+            if cooldown > Config.MAX_ALERT_COOLDOWN:
+                raise ValueError(
+                    f"❌ Repeat cooldown can be at most {Config.MAX_ALERT_COOLDOWN // COOLDOWN_UNITS['d']} days"
+                )
+    return coin.strip(), operator == ">", float(price), hysteresis, cooldown
+
+
+def check_alert(alert: Tuple, price: float, now: float) -> Optional[str]:
+    """What a price means for an alert row from Database.get_all_alerts.
+
+    Returns "fire" when an armed alert's condition is met and its cooldown
+    has ended, "rearm" when a disarmed repeating alert's price is back past
+    its hysteresis band, otherwise None.
+    """
+    _, _, _, target, is_greater, armed, threshold, ready_at = alert
+    if not armed:
+        # Disarmed repeating alert: only watch for the way back
+        if (price < threshold) if is_greater else (price > threshold):
+            return "rearm"
+        return None
+    condition_met = (price > target) if is_greater else (price < target)
+    if condition_met and ready_at <= now:
+        return "fire"
+    return None
@@ -0,0 +1,80 @@
+from functools import cached_property
+from config import Config, load_config
+
+
+class Container:
+    """Builds the bot's components on first use.
+
+    Importing a module has no side effects; nothing touches the network,
+    the database or the environment until the component that needs it is
+    first accessed. Tests and maintenance commands only pay for what they
+    use.
+    """
+
+    @cached_property
+    def config(self) -> Config:
+        return load_config()
+
+    @cached_property
+    def db(self):
+        from database import Database
+        return Database(self.config.DB_NAME)
+
+    @cached_property
+    def writer(self):
+        from db_writer import GroupCommitWriter
+        if not self.config.DB_GROUP_COMMIT:
+            return None
+        return GroupCommitWriter(self.db, window=self.config.DB_GROUP_COMMIT_WINDOW)
+
+    @cached_property
+    def coin_manager(self):
+        from coin_manager import CoinManager
+        return CoinManager(self.db)
+
+    @cached_property
+    def price_checker(self):
+        from price_checker import PriceChecker
+        return PriceChecker()
+
+    @cached_property
+    def keyboards(self):
+        from keyboards import Keyboards
+        return Keyboards()
+
+    @cached_property
+    def bot(self):
+        from aiogram import Bot
+        return Bot(token=self.config.BOT_TOKEN)
+
+    @cached_property
+    def alert_handlers(self):
+        from handlers.alerts import AlertHandlers
+        return AlertHandlers(self.db, self.coin_manager, self.price_checker, self.keyboards, self.writer)
+
+    @cached_property
+    def throttling(self):
+        from middlewares.throttling import ThrottlingMiddleware
+        return ThrottlingMiddleware(self.alert_handlers)
+
+    @cached_property
+    def lease(self):
+        from lease import CheckerLease
+        return CheckerLease(self.db.db_name, mode=self.config.CHECKER_MODE, ttl=self.config.LEASE_TTL,
+                            interval=self.config.CHECK_INTERVAL)
+
+    @cached_property
+    def checker_scheduler(self):
+        from scheduler import TickScheduler
+        return TickScheduler(self.config.CHECK_INTERVAL)
+
+    @cached_property
+    def outbox(self):
+        from outbox import OutboxDispatcher
+        return OutboxDispatcher(self.db, self.bot, self.keyboards, self.lease.instance_id)
+
+    @cached_property
+    def snapshotter(self):
+        from backup import Snapshotter
+        return Snapshotter(self.db)
+
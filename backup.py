@@ -0,0 +1,253 @@
+import argparse
+import gzip
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from os import listdir, makedirs, path, remove
+from typing import List, Optional
+from config import Config
+from database import Database
+
+
+class Snapshotter:
+    """Online database snapshots and incremental alert exports.
+
+    Full snapshots are point-in-time copies: the database runs in WAL
+    mode and a snapshot copies every page with SQLite's online backup API
+    inside a single read transaction. Writers are never blocked, and the
+    copy never restarts because of them. The price is that the WAL cannot
+    be checkpointed past the snapshot's read mark until the copy finishes,
+    so it grows by whatever is written meanwhile.
+    Every insert, update and delete on `alerts` is logged by trigger into
+    `alert_changes`; an export writes the current state of the rows changed
+    since the previous snapshot or export as gzipped JSON lines.
+    """
+
+    SNAPSHOT_PREFIX = "alerts-"
+    EXPORT_PREFIX = "changes-"
+
+    def __init__(self, db: Database, directory: str = Config.SNAPSHOT_DIR):
+        self.logger = logging.getLogger(__name__)
+        self.db = db
+        self.directory = path.join(path.dirname(db.db_name), directory)
+        self.setup_tables()
+
+    def setup_tables(self):
+        """Create change log, snapshot history and the triggers feeding them"""
+        try:
+            with sqlite3.connect(self.db.db_name) as conn:
+                # Persistent; lets snapshots read while the bot keeps writing
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS alert_changes (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        alert_id INTEGER NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS snapshots (
+                        id INTEGER PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        file TEXT NOT NULL,
+                        last_seq INTEGER NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                ''')
+                for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                    conn.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS alerts_{event.lower()}_log
+                        AFTER {event} ON alerts
+                        BEGIN
+                            INSERT INTO alert_changes (alert_id) VALUES ({row}.id);
+                        END
+                    ''')
+        except Exception as e:
+            self.logger.error(f"Snapshot setup error: {e}")
+            raise
+
+    @staticmethod
+    def _last_mark(conn: sqlite3.Connection) -> int:
+        return conn.execute('SELECT COALESCE(MAX(last_seq), 0) FROM snapshots').fetchone()[0]
+
+    @staticmethod
+    def _record(conn: sqlite3.Connection, kind: str, file: str, last_seq: int):
+        conn.execute(
+            'INSERT INTO snapshots (kind, file, last_seq, created_at) VALUES (?, ?, ?, ?)',
+            (kind, file, last_seq, time.time())
+        )
+        # Changes up to the newest mark are covered by a file on disk
+        conn.execute('DELETE FROM alert_changes WHERE seq <= ?', (last_seq,))
+
+    def last_snapshot_time(self) -> Optional[float]:
+        """When the last full snapshot was taken"""
+        with sqlite3.connect(self.db.db_name) as conn:
+            return conn.execute(
+                "SELECT MAX(created_at) FROM snapshots WHERE kind = 'full'"
+            ).fetchone()[0]
+
+    def snapshot(self) -> str:
+        """Copy the live database to a new snapshot file without stopping writers"""
+        makedirs(self.directory, exist_ok=True)
+        file = f"{self.SNAPSHOT_PREFIX}{datetime.now():%Y%m%d_%H%M%S_%f}.db"
+        target = path.join(self.directory, file)
+
+        src = sqlite3.connect(self.db.db_name, isolation_level=None)
+        try:
+            # One read transaction covers the change log mark and every page
+            # copied, so the snapshot holds exactly the changes up to last_seq.
+            # A stepped backup would restart on each write from another
+            # connection and might never finish under load.
+            src.execute('BEGIN')
+            last_seq = src.execute('SELECT COALESCE(MAX(seq), 0) FROM alert_changes').fetchone()[0]
+            dst = sqlite3.connect(target)
+            try:
+                src.backup(dst, pages=-1)
+            finally:
+                dst.close()
+            src.execute('COMMIT')
+        finally:
+            src.close()
+
+        with sqlite3.connect(self.db.db_name) as conn:
+            self._record(conn, "full", file, last_seq)
+
+        self.logger.info(f"Database snapshot written to {target}")
+        self.prune()
+        return target
+
+    def export(self) -> Optional[str]:
+        """Export alert rows changed since the last snapshot or export"""
+        with sqlite3.connect(self.db.db_name) as conn:
+            conn.row_factory = sqlite3.Row
+            since = self._last_mark(conn)
+            changes = conn.execute(
+                'SELECT MAX(seq), alert_id FROM alert_changes WHERE seq > ? GROUP BY alert_id',
+                (since,)
+            ).fetchall()
+            if not changes:
+                return None
+
+            until = max(seq for seq, _ in changes)
+            ids = [alert_id for _, alert_id in changes]
+            rows = {}
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows.update((row["id"], dict(row)) for row in conn.execute(
+                    f'SELECT * FROM alerts WHERE id IN ({",".join("?" * len(chunk))})', chunk
+                ))
+
+            makedirs(self.directory, exist_ok=True)
+            file = f"{self.EXPORT_PREFIX}{datetime.now():%Y%m%d_%H%M%S_%f}.jsonl.gz"
+            target = path.join(self.directory, file)
+            with gzip.open(target, "wt", encoding="utf-8") as out:
+                out.write(json.dumps({"since": since, "until": until}) + "\n")
+                # The coins table is small and append-only; ship all of it
+                for key, coin_id in conn.execute('SELECT key, coin_id FROM coins'):
+                    out.write(json.dumps({"coin": [key, coin_id]}) + "\n")
+                for alert_id in ids:
+                    if alert_id in rows:
+                        out.write(json.dumps({"upsert": rows[alert_id]}, default=str) + "\n")
+                    else:
+                        out.write(json.dumps({"delete": alert_id}) + "\n")
+
+            self._record(conn, "incremental", file, until)
+
+        self.logger.info(f"Exported {len(ids)} changed alerts to {target}")
+        return target
+
+    def latest_chain(self) -> List[str]:
+        """Newest full snapshot followed by the exports taken after it.
+
+        Built from file names alone, so it works when the live database is
+        gone.
+        """
+        try:
+            files = sorted(listdir(self.directory))
+        except FileNotFoundError:
+            return []
+        snapshots = [f for f in files if f.startswith(self.SNAPSHOT_PREFIX)]
+        if not snapshots:
+            return []
+        stamp = snapshots[-1][len(self.SNAPSHOT_PREFIX):-len(".db")]
+        exports = [f for f in files
+                   if f.startswith(self.EXPORT_PREFIX) and f[len(self.EXPORT_PREFIX):] > stamp]
+        return [path.join(self.directory, f) for f in [snapshots[-1]] + exports]
+
+    def prune(self, keep: int = Config.SNAPSHOT_KEEP):
+        """Delete files of all but the newest `keep` snapshot chains"""
+        with sqlite3.connect(self.db.db_name) as conn:
+            fulls = [row[0] for row in conn.execute(
+                "SELECT id FROM snapshots WHERE kind = 'full' ORDER BY id DESC"
+            ).fetchall()]
+            if len(fulls) <= keep:
+                return
+            oldest_kept = fulls[keep - 1]
+            for (file,) in conn.execute('SELECT file FROM snapshots WHERE id < ?', (oldest_kept,)).fetchall():
+                try:
+                    remove(path.join(self.directory, file))
+                except FileNotFoundError:
+                    pass
+            conn.execute('DELETE FROM snapshots WHERE id < ?', (oldest_kept,))
+
+    def restore(self, files: List[str]):
+        """Restore the live database from a full snapshot and later exports.
+
+        Run this with the bot stopped.
+        """
+        snapshot, exports = files[0], files[1:]
+        src = sqlite3.connect(snapshot)
+        try:
+            with sqlite3.connect(self.db.db_name) as dst:
+                src.backup(dst)
+        finally:
+            src.close()
+
+        with sqlite3.connect(self.db.db_name) as conn:
+            for file in exports:
+                with gzip.open(file, "rt", encoding="utf-8") as lines:
+                    next(lines)  # header
+                    for line in lines:
+                        change = json.loads(line)
+                        if "coin" in change:
+                            conn.execute('INSERT OR IGNORE INTO coins (key, coin_id) VALUES (?, ?)', change["coin"])
+                        elif "delete" in change:
+                            conn.execute('DELETE FROM alerts WHERE id = ?', (change["delete"],))
+                        else:
+                            row = change["upsert"]
+                            conn.execute(
+                                f'INSERT OR REPLACE INTO alerts ({",".join(row)}) '
+                                f'VALUES ({",".join("?" * len(row))})',
+                                tuple(row.values())
+                            )
+            # Restored rows are already on disk; start a fresh change log
+            conn.execute('DELETE FROM alert_changes')
+        self.logger.info(f"Restored {self.db.db_name} from {snapshot} and {len(exports)} export(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot, export or restore the alerts database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help="take a full online snapshot")
+    commands.add_parser("export", help="export alerts changed since the last snapshot or export")
+    restore = commands.add_parser("restore", help="restore from a snapshot and exports (bot must be stopped)")
+    restore.add_argument("files", nargs="*", help="snapshot followed by exports; default is the latest chain")
+    args = parser.parse_args()
+
+    from app import Container
+    snapshotter = Container().snapshotter
+    if args.command == "snapshot":
+        print(snapshotter.snapshot())
+    elif args.command == "export":
+        print(snapshotter.export() or "No changes since the last snapshot")
+    else:
+        files = args.files or snapshotter.latest_chain()
+        if not files:
+            parser.error("no snapshots found")
+        snapshotter.restore(files)
+
+
+if __name__ == "__main__":
+    import logger  # noqa: F401
+    main()
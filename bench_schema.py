@@ -0,0 +1,113 @@
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from os import path
+
+from database import Database
+
+# The alerts table as it was before integer coin keys
+LEGACY_SCHEMA = '''
+    CREATE TABLE alerts (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        coin TEXT,
+        target_price REAL,
+        is_greater_than BOOLEAN,
+        created_at TIMESTAMP,
+        hysteresis REAL,
+        cooldown INTEGER NOT NULL DEFAULT 0,
+        armed INTEGER NOT NULL DEFAULT 1,
+        last_fired_at INTEGER,
+        UNIQUE(user_id, coin, target_price, is_greater_than)
+    )
+'''
+
+LEGACY_SCAN = '''
+    SELECT id, user_id, coin, target_price, is_greater_than, armed,
+           CASE WHEN armed THEN target_price
+                WHEN is_greater_than THEN target_price * (1 - hysteresis)
+                ELSE target_price * (1 + hysteresis) END,
+           COALESCE(last_fired_at + cooldown, 0)
+    FROM alerts
+'''
+
+WORDS = ["bitcoin", "ethereum", "wrapped", "staked", "protocol", "finance", "network", "token",
+         "chain", "swap", "dao", "classic", "cash", "gold", "meta", "verse", "inu", "ai"]
+
+
+def coin_ids(count: int, rng: random.Random):
+    """CoinGecko-like ids, e.g. 'wrapped-staked-ether-17'"""
+    return [f"{'-'.join(rng.sample(WORDS, rng.randint(1, 3)))}-{i}" for i in range(count)]
+
+
+def build_legacy(db_name: str, alerts: int, coins: int, seed: int):
+    rng = random.Random(seed)
+    ids = coin_ids(coins, rng)
+    start = datetime(2024, 1, 1)
+    with sqlite3.connect(db_name) as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            'INSERT OR IGNORE INTO alerts (user_id, coin, target_price, is_greater_than, created_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            ((rng.randrange(alerts // 10 or 1), rng.choice(ids), round(rng.uniform(0.01, 100000), 2),
+              rng.random() < 0.5, start + timedelta(seconds=rng.randrange(365 * 86400)))
+             for _ in range(alerts))
+        )
+    vacuum(db_name)
+
+
+def vacuum(db_name: str):
+    conn = sqlite3.connect(db_name)
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def best_of(runs: int, scan) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        scan()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the legacy TEXT coin schema with integer coin keys on synthetic alerts"
+    )
+    parser.add_argument("--alerts", type=int, default=1_000_000)
+    parser.add_argument("--coins", type=int, default=310)
+    parser.add_argument("--runs", type=int, default=5, help="get_all_alerts scans; the best is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = path.join(directory, "alerts.db")
+        build_legacy(db_name, args.alerts, args.coins, args.seed)
+        legacy_size = path.getsize(db_name)
+
+        def legacy_scan():
+            with sqlite3.connect(db_name) as conn:
+                return conn.execute(LEGACY_SCAN).fetchall()
+        legacy_time = best_of(args.runs, legacy_scan)
+
+        started = time.perf_counter()
+        db = Database(db_name)
+        migration_time = time.perf_counter() - started
+        vacuum(db_name)
+        size = path.getsize(db_name)
+        scan_time = best_of(args.runs, db.get_all_alerts)
+        rows = len(db.get_all_alerts())
+
+    print(f"{rows} alerts over {args.coins} coins, after VACUUM")
+    print(f"file size:      {legacy_size / 1e6:.1f} MB -> {size / 1e6:.1f} MB ({size / legacy_size - 1:+.0%})")
+    print(f"get_all_alerts: {legacy_time:.2f} s -> {scan_time:.2f} s ({scan_time / legacy_time - 1:+.0%}, "
+          f"best of {args.runs})")
+    print(f"migration:      {migration_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,17 @@
+import time
+STARTED_AT = time.perf_counter()  # excludes interpreter startup
+
 from logger import logging
 import asyncio
-from aiogram import Bot, Dispatcher, types, html
+from aiogram import Dispatcher, types, html
 from aiogram.enums import ParseMode
 from aiogram.filters import Command
-from coin_manager import coin_manager
-from config import config
-from database import Database
-from keyboards import keyboards
-from handlers.alerts import AlertHandlers
-from price_checker import price_checker
-
-# Setup
-bot = Bot(token=config.BOT_TOKEN)
+from alert_rules import check_alert
+from app import Container
+
+# Setup: components are built on first use
+app = Container()
 dp = Dispatcher()
-db = Database(config.DB_NAME)
-alert_handlers = AlertHandlers(db)
 
 # Command handlers
 @dp.message(Command("start"))
@@ -32,7 +29,7 @@ async def cmd_start(message: types.Message):
     )
     await message.answer(
         welcome_message,
-        reply_markup=keyboards.main_keyboard(),
+        reply_markup=app.keyboards.main_keyboard(),
         parse_mode=ParseMode.HTML,
     )
 
@@ -45,7 +42,9 @@ async def cmd_help(message: types.Message):
         "/alert <coin> <operator> <price>\n"
         "Examples:\n"
         "/alert BTC > 50000\n"
-        "/alert ETH < 2000\n\n"
+        "/alert ETH < 2000\n"
+        "/alert BTC > 50000 repeat 2%\n"
+        "/alert BTC > 50000 repeat 2% 30m\n\n"
 
         "📋 Manage Alerts:\n"
         "/alerts - View your alerts\n"
@@ -59,36 +58,36 @@ async def cmd_help(message: types.Message):
         "💡 Note:\n"
         "• Supports both full name and symbol (Bitcoin, BTC)\n"
         "• You can set multiple alerts for the same coin\n"
-        "• One alert triggers once\n"
+        "• One alert triggers once, unless set with repeat\n"
         "• Check numbers with /alerts\n"
         "• Remove alerts by coin or number.",
-        reply_markup=keyboards.main_keyboard(),
+        reply_markup=app.keyboards.main_keyboard(),
     )
 
 
 @dp.message(Command("alert"))
 async def cmd_alert(message: types.Message):
-    await alert_handlers.cmd_alert(message.from_user.id, message)
+    await app.alert_handlers.cmd_alert(message.from_user.id, message)
 
 
 @dp.message(Command("alerts"))
 async def cmd_alerts(message: types.Message):
-    await alert_handlers.show_alerts(message.from_user.id, message)
+    await app.alert_handlers.show_alerts(message.from_user.id, message)
 
 
 @dp.message(Command("remove"))
 async def cmd_remove(message: types.Message):
-    await alert_handlers.cmd_remove(message.from_user.id, message)
+    await app.alert_handlers.cmd_remove(message.from_user.id, message)
 
 
 @dp.message(Command("removeall"))
 async def cmd_remove(message: types.Message):
-    await alert_handlers.cmd_removeall(message.from_user.id, message)
+    await app.alert_handlers.cmd_removeall(message.from_user.id, message)
 
 
 @dp.message()
 async def echo_handler(message: types.Message):
-    await message.reply("Unknown commands 🤔", reply_markup=keyboards.help_keyboard())
+    await message.reply("Unknown commands 🤔", reply_markup=app.keyboards.help_keyboard())
 
 
 # Callback query handlers
@@ -101,7 +100,7 @@ async def handle_callback(callback: types.CallbackQuery):
             "/alert ETH < 2000"
         )
     elif callback.data == "view_alerts":
-        await alert_handlers.show_alerts(callback.from_user.id, callback.message)
+        await app.alert_handlers.show_alerts(callback.from_user.id, callback.message)
     elif callback.data == "help":
         await cmd_help(callback.message)
         # await callback.message.answer(config.HELP_MESSAGE)
@@ -109,75 +108,111 @@ async def handle_callback(callback: types.CallbackQuery):
 
 
 async def check_alerts():
-    """Background task to check alerts"""
-    while True:
+    """Background task to check alerts on a fixed tick schedule"""
+    scheduler = app.checker_scheduler
+    async for _ in scheduler.ticks():
         try:
-            alerts = db.get_all_alerts()
+            # Only the lease holder (or the owner of a coin partition) checks.
+            # The heartbeat can wait on a locked database; keep it off the loop.
+            alerts = app.db.get_all_alerts() if await asyncio.to_thread(app.lease.heartbeat) else []
+
+            # Resolve integer coin keys once per unique coin
+            coin_ids = {key: app.coin_manager.get_coin_id_by_key(key) for key in set(alert[2] for alert in alerts)}
+            coin_ids = {key: coin_id for key, coin_id in coin_ids.items() if coin_id and app.lease.owns(coin_id)}
+            alerts = [alert for alert in alerts if alert[2] in coin_ids]
+            if alerts and not app.coin_manager.loaded:
+                # Names are only for display and fall back to coin ids; retry
+                # the coin list in the background without holding up the check
+                app.coin_manager.warm_up()
             if alerts:
-                # Get unique coins
-                coin_ids = list(set(alert[2] for alert in alerts))
-                prices = await price_checker.get_prices(coin_ids)
+                prices = await app.price_checker.get_prices(list(coin_ids.values()))
 
-                send_list = {}  # Initialize empty dictionary
+                fired = []  # (alert, notification line)
+                rearmed = []
+                now = time.time()
 
                 # Check each alert
-                for alert_id, user_id, coin_id, target, is_greater in alerts:
+                for alert in alerts:
+                    alert_id, _, coin_key, target, is_greater = alert[:5]
+                    coin_id = coin_ids[coin_key]
                     current_price = prices.get(coin_id)
-                    if current_price:
-                        condition_met = (
-                                (is_greater and current_price > target) or
-                                (not is_greater and current_price < target)
+                    if not current_price:
+                        continue
+
+                    action = check_alert(alert, current_price, now)
+                    if action == "rearm":
+                        rearmed.append(alert_id)
+                    elif action == "fire":
+                        # Lines are grouped into one message per user when queued
+                        alert_info = (
+                            f"• {app.coin_manager.get_coin_name(coin_id)}: "
+                            f"{app.price_checker.format_price(current_price)}\n"
+                            f"  Target: {'>' if is_greater else '<'} "
+                            f"{app.price_checker.format_price(target)}"
                         )
+                        fired.append((alert, alert_info))
 
-                        if condition_met:
-                            # Initialize list for user if not exists
-                            if user_id not in send_list:
-                                send_list[user_id] = []
-
-                            # Add alert info to user's list
-                            alert_info = (
-                                f"• {coin_manager.get_coin_name(coin_id)}: "
-                                f"{price_checker.format_price(current_price)}\n"
-                                f"  Target: {'>' if is_greater else '<'} "
-                                f"{price_checker.format_price(target)}"
-                            )
-                            send_list[user_id].append(alert_info)
-
-                # Send consolidated messages to users
-                for user_id, alerts_list in send_list.items():
-                    try:
-                        message = (
-                                "🎯 Target(s) reached!\n\n" +
-                                "\n\n".join(alerts_list)
-                        )
+                # Always re-arm: shedding it under sustained load would keep
+                # repeating alerts disarmed for as long as the load lasts
+                if rearmed:
+                    app.db.rearm_alerts(rearmed)
 
-                        await bot.send_message(
-                            user_id,
-                            message,
-                            reply_markup=keyboards.main_keyboard()
-                        )
+                # Queue consolidated messages; the outbox dispatcher sends them
+                if fired and app.db.fire_alerts(fired, "🎯 Target(s) reached!\n\n"):
+                    for user_id in set(alert[1] for alert, _ in fired):
+                        app.alert_handlers.invalidate_alerts_cache(user_id)
+                    app.outbox.wake()
 
-                    except Exception as e:
-                        logging.error(f"Error sending message to user {user_id}: {e}")
+            # Non-critical housekeeping is shed while ticks run long
+            if app.lease.runs_housekeeping and not scheduler.overloaded:
+                app.outbox.purge()
 
         except Exception as e:
             logging.error(f"Error in check_alerts: {e}")
 
-        await asyncio.sleep(config.CHECK_INTERVAL)
+
+async def take_snapshots():
+    """Background task for periodic snapshots and incremental exports"""
+    snapshotter = app.snapshotter  # installs the change log triggers
+    while True:
+        await asyncio.sleep(app.config.SNAPSHOT_INTERVAL)
+        if not app.lease.runs_housekeeping:
+            continue
+        # Let an overloaded checker catch up first
+        while app.checker_scheduler.overloaded:
+            await asyncio.sleep(app.config.CHECK_INTERVAL)
+        try:
+            last_snapshot = snapshotter.last_snapshot_time()
+            if not last_snapshot or time.time() - last_snapshot >= app.config.SNAPSHOT_FULL_INTERVAL:
+                await asyncio.to_thread(snapshotter.snapshot)
+            else:
+                await asyncio.to_thread(snapshotter.export)
+        except Exception as e:
+            logging.error(f"Error taking snapshot: {e}")
 
 
 async def main():
+    dp.message.middleware(app.throttling)
+    dp.callback_query.middleware(app.throttling)
+
     # Start the alert checking loop
     asyncio.create_task(check_alerts())
+    asyncio.create_task(app.outbox.run())
+    asyncio.create_task(take_snapshots())
+    # Warm the coins list without holding up startup
+    app.coin_manager.warm_up()
     try:
         logging.info("Starting My Coins Alert bot...")
+        bot = app.bot
+        logging.info(f"Ready {(time.perf_counter() - STARTED_AT) * 1000:.0f} ms after bot.py started loading")
         # Start polling
         await dp.start_polling(bot)
     except Exception as e:
         logging.error(f"Bot stopped with error: {e}")
     finally:
         logging.info("Bot stopped")
-        await bot.session.close()
+        app.lease.release()
+        await app.bot.session.close()
 
 
 if __name__ == "__main__":
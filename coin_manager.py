@@ -1,19 +1,33 @@
+import asyncio
 import logging
+import time
 from typing import Dict, List, Optional
-from pycoingecko import CoinGeckoAPI
 from config import Config
+from database import Database
 from datetime import datetime
 
 
 class CoinManager:
-    def __init__(self):
+    def __init__(self, db: Database):
         self.logger = logging.getLogger(__name__)
-        self.init_date = datetime.now()
-        self.cg = CoinGeckoAPI()
+        self.db = db
+        self.init_date: Optional[datetime] = None
+        self._cg = None
+        self._loading: Optional[asyncio.Lock] = None
+        self._warm_up: Optional[asyncio.Task] = None
+        self._failed_at: Optional[float] = None
         self.symbol_to_id: Dict[str, str] = {}
         self.name_to_id: Dict[str, str] = {}
         self.display_names: Dict[str, str] = {}
-        self.initialize_coins()
+        # Integer keys of the database's coins table
+        self.key_to_id: Dict[int, str] = {}
+
+    @property
+    def cg(self):
+        if self._cg is None:
+            from pycoingecko import CoinGeckoAPI
+            self._cg = CoinGeckoAPI()
+        return self._cg
 
     def __add_to(self, items: List[Dict]) -> None:
         """Add coins to mapping dictionaries"""
@@ -46,14 +60,48 @@ class CoinManager:
             self.logger.info(f"Initialized {len(self.symbol_to_id)} coins by symbol")
             self.logger.info(f"Initialized {len(self.name_to_id)} coins by name")
             self.logger.info(f"Initialized {len(self.display_names)} display names")  # Added this
+            self.init_date = datetime.now()
 
         except Exception as e:
             self.logger.error(f"Error initializing coins: {e}")
             raise
 
+    @property
+    def loaded(self) -> bool:
+        return self.init_date is not None
+
+    async def load(self) -> bool:
+        """Fetch the coins list on first use; returns False if it is unavailable.
+
+        The fetch runs in a worker thread and concurrent callers wait for
+        the same one, so the event loop is never blocked. Lookups don't
+        fetch; callers await this first.
+        """
+        if self.init_date:
+            return True
+        if self._loading is None:
+            self._loading = asyncio.Lock()
+        async with self._loading:
+            if not self.init_date:
+                # Don't hammer CoinGecko on every request while it is down
+                if self._failed_at is not None and time.monotonic() - self._failed_at < 60:
+                    return False
+                try:
+                    await asyncio.to_thread(self.initialize_coins)
+                except Exception:
+                    self._failed_at = time.monotonic()
+                    return False
+        return True
+
+    def warm_up(self) -> asyncio.Task:
+        """Start loading in the background, unless a load is already running"""
+        if self._warm_up is None or self._warm_up.done():
+            self._warm_up = asyncio.create_task(self.load())
+        return self._warm_up
+
     def get_coin_name(self, coin_id: str) -> Optional[str]:
         """Get original case-sensitive name for a coin ID"""
-        return self.display_names.get(coin_id)
+        return self.display_names.get(coin_id, coin_id)
 
     def get_coin_id(self, user_input: str) -> Optional[str]:
         """Get coin ID from symbol or name"""
@@ -68,6 +116,11 @@ class CoinManager:
         """Get coin ID by name only"""
         return self.name_to_id.get(name.lower())
 
-
-# Create singleton instance
-coin_manager = CoinManager()
\ No newline at end of file
+    def get_coin_id_by_key(self, key: int) -> Optional[str]:
+        """Get coin ID for an integer coin key stored in alerts"""
+        coin_id = self.key_to_id.get(key)
+        if coin_id is None:
+            # Coins are only ever added, so reload on a miss
+            self.key_to_id = dict(self.db.get_coins())
+            coin_id = self.key_to_id.get(key)
+        return coin_id
@@ -1,25 +1,63 @@
 import os
-from dataclasses import dataclass
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
 
-# Load environment variables from .env file
-load_dotenv()
 
 @dataclass
 class Config:
-    BOT_TOKEN: str = os.getenv("BOT_TOKEN")
+    BOT_TOKEN: str = field(default_factory=lambda: os.getenv("BOT_TOKEN"))
 
     # Database settings
     DB_NAME: str = "alerts.db"
+    DB_GROUP_COMMIT: bool = False  # batch alert writes into one transaction
+    DB_GROUP_COMMIT_WINDOW: float = 0.005  # seconds to collect a batch
+
+    # Snapshot settings
+    SNAPSHOT_DIR: str = "snapshots"  # relative to the database file
+    SNAPSHOT_INTERVAL: int = 24 * 60 * 60  # seconds between exports
+    SNAPSHOT_FULL_INTERVAL: int = 7 * 24 * 60 * 60  # seconds between full snapshots
+    SNAPSHOT_KEEP: int = 4  # full snapshot chains kept on disk
 
     # Price checker settings
     CHECK_INTERVAL: int = 30  # seconds
     PRICE_CACHE_TIME: int = 30  # seconds
 
+    # Multi-instance settings
+    CHECKER_MODE: str = field(default_factory=lambda: os.getenv("CHECKER_MODE", "leader"))  # "leader" or "partition"
+    LEASE_TTL: int = 90  # seconds, must be longer than CHECK_INTERVAL
+
+    # Notification outbox settings
+    OUTBOX_BATCH_SIZE: int = 20  # messages claimed and recorded together
+    OUTBOX_POLL_INTERVAL: int = 5  # seconds
+    OUTBOX_SEND_TIMEOUT: int = 20  # seconds per Telegram request
+    OUTBOX_CLAIM_TIMEOUT: int = 60  # seconds before a crashed sender's batch is retried; renewed per message,
+                                    # so it must exceed OUTBOX_SEND_TIMEOUT
+    OUTBOX_RETRY_DELAY: int = 5  # seconds, doubled on every failed attempt
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETENTION: int = 24 * 60 * 60  # seconds to keep delivered messages
+
+    # Throttling settings (per user token bucket)
+    THROTTLE_RATE: float = 0.5  # tokens refilled per second
+    THROTTLE_CAPACITY: float = 10  # burst size
+    THROTTLE_MAX_USERS: int = 10000  # buckets and cached renders kept in memory
+
     # Alert settings
     MAX_ALERTS_PER_USER: int = 1000
     MIN_PRICE: float = 0.000001
     MAX_PRICE: float = 1000000000
+    ALERT_HYSTERESIS: float = 0.01  # default re-arm band for repeating alerts (1%)
+    MAX_ALERT_HYSTERESIS: float = 0.5
+    ALERT_COOLDOWN: int = 60 * 60  # default seconds between repeated notifications
+    MAX_ALERT_COOLDOWN: int = 7 * 24 * 60 * 60
+
+    # Token cost per command or callback
+    THROTTLE_COSTS = {
+        "default": 1,
+        "alert": 2,
+        "alerts": 3,
+        "view_alerts": 3,
+        "remove": 2,
+        "removeall": 2,
+    }
 
     SYMBOL_PRIORITY_MAP = {
         # Top Market Cap Coins (Verified December 2023)
@@ -154,4 +192,8 @@ class Config:
     }
 
 
-config = Config()
\ No newline at end of file
+def load_config() -> Config:
+    """Load environment variables from .env file and build the config"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return Config()
@@ -1,8 +1,9 @@
 import sqlite3
 import logging
-from datetime import datetime
-from typing import List, Tuple, Optional
-from os import path
+import time
+from typing import Dict, Iterable, List, Tuple, Optional
+from os import listdir, makedirs, path, replace
+from config import Config
 
 class Database:
     def __init__(self, db_name: str = "alerts.db"):
@@ -18,32 +19,129 @@ class Database:
         """Initialize database and create tables if they don't exist"""
         try:
             with sqlite3.connect(self.db_name) as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS coins (
+                        key INTEGER PRIMARY KEY,
+                        coin_id TEXT NOT NULL UNIQUE
+                    )
+                ''')
+                # Alerts from before coin keys are rebuilt in one transaction
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(alerts)')}
+                legacy = "coin" in columns
+                if legacy:
+                    conn.execute('BEGIN')
+                    conn.execute('ALTER TABLE alerts RENAME TO alerts_old')
                 conn.execute('''
                     CREATE TABLE IF NOT EXISTS alerts (
                         id INTEGER PRIMARY KEY,
-                        user_id INTEGER,
-                        coin TEXT,
-                        target_price REAL,
-                        is_greater_than BOOLEAN,
-                        created_at TIMESTAMP,
-                        UNIQUE(user_id, coin, target_price, is_greater_than)
+                        user_id INTEGER NOT NULL,
+                        coin_key INTEGER NOT NULL REFERENCES coins (key),
+                        target_price REAL NOT NULL,
+                        direction INTEGER NOT NULL,  -- 1: above target, 0: below
+                        created_at INTEGER NOT NULL,  -- unix epoch
+                        hysteresis REAL,
+                        cooldown INTEGER NOT NULL DEFAULT 0,
+                        armed INTEGER NOT NULL DEFAULT 1,
+                        last_fired_at INTEGER,
+                        UNIQUE(user_id, coin_key, target_price, direction)
                     )
                 ''')
+                if legacy:
+                    self.migrate_alerts(conn, columns)
+                    conn.commit()
+                    self.archive_snapshots()
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        id INTEGER PRIMARY KEY,
+                        idempotency_key TEXT NOT NULL UNIQUE,  -- user_id:fired_at
+                        user_id INTEGER NOT NULL,
+                        text TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        available_at REAL NOT NULL,
+                        claimed_by TEXT,
+                        claimed_at REAL,
+                        created_at REAL NOT NULL,
+                        sent_at REAL
+                    )
+                ''')
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, available_at)'
+                )
         except Exception as e:
             self.logger.error(f"Database setup error: {e}")
             raise
 
-    def add_alert(self, user_id: int, coin: str, target_price: float, is_greater_than: bool) -> bool:
-        """Add new alert to database"""
+    def migrate_alerts(self, conn: sqlite3.Connection, columns: set):
+        """Copy alerts from the TEXT coin id table (renamed to alerts_old)"""
+        self.logger.info("Migrating alerts to integer coin keys...")
+        conn.execute('INSERT OR IGNORE INTO coins (coin_id) SELECT DISTINCT coin FROM alerts_old')
+        # Repeating alert state only exists in databases created after it was added
+        repeat_columns = "a.hysteresis, a.cooldown, a.armed, a.last_fired_at" \
+            if "hysteresis" in columns else "NULL, 0, 1, NULL"
+        conn.execute(f'''
+            INSERT INTO alerts
+            SELECT a.id, a.user_id, c.key, a.target_price,
+                   CASE WHEN a.is_greater_than THEN 1 ELSE 0 END,
+                   COALESCE(CAST(strftime('%s', a.created_at, 'utc') AS INTEGER), 0),
+                   {repeat_columns}
+            FROM alerts_old a JOIN coins c ON c.coin_id = a.coin
+            ORDER BY a.id
+        ''')
+        conn.execute('DROP TABLE alerts_old')
+        # Snapshots taken so far hold the old schema; start a new chain
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'snapshots'").fetchone():
+            conn.execute('DELETE FROM snapshots')
+
+    def archive_snapshots(self):
+        """Move snapshot files of the old schema out of the restore chain.
+
+        Restore picks the newest chain by file name alone, so the files are
+        moved into a subdirectory rather than only forgotten by the
+        `snapshots` table; they are kept in case the migration is undone.
+        """
+        directory = path.join(path.dirname(self.db_name), Config.SNAPSHOT_DIR)
+        try:
+            files = [f for f in listdir(directory) if path.isfile(path.join(directory, f))]
+        except FileNotFoundError:
+            return
+        archive = path.join(directory, "pre-migration")
+        try:
+            makedirs(archive, exist_ok=True)
+            for file in files:
+                replace(path.join(directory, file), path.join(archive, file))
+            self.logger.info(f"Moved {len(files)} old snapshot file(s) to {archive}")
+        except OSError as e:
+            self.logger.error(f"Error archiving old snapshots, move them out of {directory} by hand: {e}")
+
+    # Mutations are split into a `_name(conn, ...)` part that runs inside a
+    # caller's transaction, so GroupCommitWriter can batch them, and a public
+    # wrapper that commits on its own connection.
+
+    @staticmethod
+    def _add_alert(conn: sqlite3.Connection, user_id: int, coin: str, target_price: float,
+                   is_greater_than: bool, hysteresis: Optional[float] = None, cooldown: int = 0) -> bool:
+        coin = coin.lower()
+        conn.execute('INSERT OR IGNORE INTO coins (coin_id) VALUES (?)', (coin,))
+        conn.execute(
+            '''INSERT INTO alerts 
+               (user_id, coin_key, target_price, direction, created_at, hysteresis, cooldown) 
+               SELECT ?, key, ?, ?, ?, ?, ? FROM coins WHERE coin_id = ?''',
+            (user_id, target_price, int(is_greater_than), int(time.time()), hysteresis, cooldown, coin)
+        )
+        return True
+
+    def add_alert(self, user_id: int, coin: str, target_price: float, is_greater_than: bool,
+                  hysteresis: Optional[float] = None, cooldown: int = 0) -> bool:
+        """Add new alert to database.
+
+        Alerts with a `hysteresis` band repeat: after firing they re-arm once
+        the price moves back past the band, and fire again no sooner than
+        `cooldown` seconds later. One-time alerts leave it as None.
+        """
         try:
             with sqlite3.connect(self.db_name) as conn:
-                conn.execute(
-                    '''INSERT INTO alerts 
-                       (user_id, coin, target_price, is_greater_than, created_at) 
-                       VALUES (?, ?, ?, ?, ?)''',
-                    (user_id, coin.lower(), target_price, is_greater_than, datetime.now())
-                )
-                return True
+                return self._add_alert(conn, user_id, coin, target_price, is_greater_than, hysteresis, cooldown)
         except sqlite3.IntegrityError:
             # Alert already exists
             return False
@@ -56,72 +154,103 @@ class Database:
         try:
             with sqlite3.connect(self.db_name) as conn:
                 return conn.execute(
-                    '''SELECT id, coin, target_price, is_greater_than, created_at 
-                       FROM alerts 
-                       WHERE user_id = ? 
-                       ORDER BY created_at''',
+                    '''SELECT a.id, c.coin_id, a.target_price, a.direction, a.created_at, a.hysteresis 
+                       FROM alerts a JOIN coins c ON c.key = a.coin_key 
+                       WHERE a.user_id = ? 
+                       ORDER BY a.created_at, a.id''',
                     (user_id,)
                 ).fetchall()
         except Exception as e:
             self.logger.error(f"Error getting user alerts: {e}")
             return []
 
+    @staticmethod
+    def _remove_alert(conn: sqlite3.Connection, alert_id: int, user_id: int) -> bool:
+        cursor = conn.execute(
+            'DELETE FROM alerts WHERE id = ? AND user_id = ?',
+            (alert_id, user_id)
+        )
+        return cursor.rowcount > 0
+
     def remove_alert(self, alert_id: int, user_id: int) -> bool:
         """Remove specific alert for a user"""
         try:
             with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.execute(
-                    'DELETE FROM alerts WHERE id = ? AND user_id = ?',
-                    (alert_id, user_id)
-                )
-                return cursor.rowcount > 0
+                return self._remove_alert(conn, alert_id, user_id)
         except Exception as e:
             self.logger.error(f"Error removing alert: {e}")
             return False
 
+    @staticmethod
+    def _remove_alert_by_index(conn: sqlite3.Connection, user_id: int, index: int) -> Tuple[bool, Optional[str]]:
+        alerts = conn.execute(
+            '''SELECT a.id, c.coin_id FROM alerts a JOIN coins c ON c.key = a.coin_key 
+               WHERE a.user_id = ? ORDER BY a.created_at, a.id''',
+            (user_id,)
+        ).fetchall()
+
+        if 0 <= index < len(alerts):
+            alert_id, coin = alerts[index]
+            conn.execute('DELETE FROM alerts WHERE id = ?', (alert_id,))
+            return True, coin
+        return False, None
+
     def remove_alert_by_index(self, user_id: int, index: int) -> Tuple[bool, Optional[str]]:
         """Remove alert by its index in user's alert list"""
         try:
             with sqlite3.connect(self.db_name) as conn:
-                alerts = conn.execute(
-                    'SELECT id, coin FROM alerts WHERE user_id = ? ORDER BY created_at',
-                    (user_id,)
-                ).fetchall()
-
-                if 0 <= index < len(alerts):
-                    alert_id, coin = alerts[index]
-                    conn.execute('DELETE FROM alerts WHERE id = ?', (alert_id,))
-                    return True, coin
-                return False, None
+                return self._remove_alert_by_index(conn, user_id, index)
         except Exception as e:
             self.logger.error(f"Error removing alert by index: {e}")
             return False, None
 
+    @staticmethod
+    def _remove_alert_by_coin(conn: sqlite3.Connection, user_id: int, coin_id: str) -> bool:
+        cursor = conn.execute(
+            "DELETE FROM alerts WHERE user_id = ? AND coin_key = (SELECT key FROM coins WHERE coin_id = ?)",
+            (user_id, coin_id)
+        )
+        return cursor.rowcount > 0
+
     def remove_alert_by_coin(self, user_id: int, coin_id: str) -> bool:
         try:
             with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.execute("DELETE FROM alerts WHERE user_id = ? AND coin = ?", (user_id,coin_id,))
-                return cursor.rowcount > 0
+                return self._remove_alert_by_coin(conn, user_id, coin_id)
         except Exception as e:
             self.logger.error(f"Error removing triggered alert: {e}")
             return False
 
+    @staticmethod
+    def _remove_alert_by_user(conn: sqlite3.Connection, user_id: int) -> bool:
+        conn.execute('DELETE FROM alerts WHERE user_id = ?', (user_id,))
+        return True
+
     def remove_alert_by_user(self, user_id: int) -> bool:
         """Remove alert after it's been triggered"""
         try:
             with sqlite3.connect(self.db_name) as conn:
-                conn.execute('DELETE FROM alerts WHERE user_id = ?', (user_id,))
-                return True
+                return self._remove_alert_by_user(conn, user_id)
         except Exception as e:
             self.logger.error(f"Error removing triggered alert: {e}")
             return False
 
     def get_all_alerts(self) -> List[Tuple]:
-        """Get all active alerts from all users"""
+        """Get all active alerts from all users.
+
+        Rows are (id, user_id, coin_key, target_price, direction, armed,
+        threshold, ready_at); the checker resolves coin keys with
+        CoinManager.get_coin_id_by_key, which caches get_coins(). For
+        disarmed alerts `threshold` is the price that re-arms them;
+        `ready_at` is when the cooldown ends.
+        """
         try:
             with sqlite3.connect(self.db_name) as conn:
                 return conn.execute(
-                    '''SELECT id, user_id, coin, target_price, is_greater_than 
+                    '''SELECT id, user_id, coin_key, target_price, direction, armed,
+                              CASE WHEN armed THEN target_price
+                                   WHEN direction THEN target_price * (1 - hysteresis)
+                                   ELSE target_price * (1 + hysteresis) END,
+                              COALESCE(last_fired_at + cooldown, 0)
                        FROM alerts'''
                 ).fetchall()
         except Exception as e:
@@ -143,12 +272,21 @@ class Database:
         try:
             with sqlite3.connect(self.db_name) as conn:
                 return [row[0] for row in conn.execute(
-                    'SELECT DISTINCT coin FROM alerts'
+                    'SELECT coin_id FROM coins WHERE key IN (SELECT DISTINCT coin_key FROM alerts)'
                 ).fetchall()]
         except Exception as e:
             self.logger.error(f"Error getting unique coins: {e}")
             return []
 
+    def get_coins(self) -> List[Tuple[int, str]]:
+        """Get (key, coin_id) pairs of every coin ever used in an alert"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                return conn.execute('SELECT key, coin_id FROM coins').fetchall()
+        except Exception as e:
+            self.logger.error(f"Error getting coins: {e}")
+            return []
+
     def get_alerts_count(self, user_id: int) -> int:
         """Get count of alerts for a user"""
         try:
@@ -159,4 +297,154 @@ class Database:
                 ).fetchone()[0]
         except Exception as e:
             self.logger.error(f"Error getting alerts count: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+    def fire_alerts(self, fired: List[Tuple[Tuple, str]], title: str) -> int:
+        """Fire triggered alerts and queue their notifications atomically.
+
+        `fired` holds (alert, line) pairs, with alerts as returned by
+        get_all_alerts. One-time alerts are removed and repeating alerts
+        disarmed, each by a conditional DELETE/UPDATE matching the row as it
+        was read, in the same transaction as the outbox insert. That guard
+        is the only duplicate protection: an alert another checker already
+        fired, or whose id was reused since, changes no row and is skipped.
+        Each user gets one message built from the lines of the alerts this
+        transaction fired. Returns the number of notifications queued.
+        """
+        fired_at = time.time()
+        queued = 0
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                lines: Dict[int, List[str]] = {}
+                for alert, line in fired:
+                    alert_id, user_id, coin_key, target_price, direction = alert[:5]
+                    same_row = "id = ? AND user_id = ? AND coin_key = ? AND target_price = ? AND direction = ?"
+                    identity = (alert_id, user_id, coin_key, target_price, direction)
+                    changed = conn.execute(
+                        f'DELETE FROM alerts WHERE {same_row} AND hysteresis IS NULL', identity
+                    ).rowcount
+                    changed += conn.execute(
+                        f'''UPDATE alerts SET armed = 0, last_fired_at = ? 
+                            WHERE {same_row} AND hysteresis IS NOT NULL AND armed = 1''',
+                        (int(fired_at), *identity)
+                    ).rowcount
+                    if changed:
+                        lines.setdefault(user_id, []).append(line)
+
+                for user_id, user_lines in lines.items():
+                    # One message per user per transaction, so the key is unique
+                    conn.execute(
+                        '''INSERT INTO outbox 
+                           (idempotency_key, user_id, text, available_at, created_at) 
+                           VALUES (?, ?, ?, ?, ?)''',
+                        (f"{user_id}:{fired_at!r}", user_id, title + "\n\n".join(user_lines), fired_at, fired_at)
+                    )
+                    queued += 1
+            return queued
+        except Exception as e:
+            self.logger.error(f"Error firing alerts: {e}")
+            return 0
+
+    def rearm_alerts(self, alert_ids: List[int]) -> bool:
+        """Re-arm repeating alerts whose price moved back past the band"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.executemany(
+                    'UPDATE alerts SET armed = 1 WHERE id = ?',
+                    [(alert_id,) for alert_id in alert_ids]
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error re-arming alerts: {e}")
+            return False
+
+    def claim_outbox(self, claimed_by: str, limit: int, stale_after: float) -> List[Tuple]:
+        """Claim due notifications for sending.
+
+        Rows left in 'sending' by a crashed dispatcher are claimed again
+        once `stale_after` seconds have passed.
+        """
+        now = time.time()
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.execute(
+                    '''UPDATE outbox SET status = 'sending', claimed_by = ?, claimed_at = ?
+                       WHERE id IN (
+                           SELECT id FROM outbox
+                           WHERE (status = 'pending' AND available_at <= ?)
+                              OR (status = 'sending' AND claimed_at < ?)
+                           ORDER BY id LIMIT ?
+                       )''',
+                    (claimed_by, now, now, now - stale_after, limit)
+                )
+                return conn.execute(
+                    '''SELECT id, user_id, text, attempts FROM outbox 
+                       WHERE status = 'sending' AND claimed_by = ? AND claimed_at = ?
+                       ORDER BY id''',
+                    (claimed_by, now)
+                ).fetchall()
+        except Exception as e:
+            self.logger.error(f"Error claiming outbox: {e}")
+            return []
+
+    def renew_outbox_claim(self, claimed_by: str, outbox_ids: List[int]) -> int:
+        """Extend the claim on rows still being sent; returns how many are still ours"""
+        placeholders = ",".join("?" * len(outbox_ids))
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                return conn.execute(
+                    f"""UPDATE outbox SET claimed_at = ? 
+                        WHERE id IN ({placeholders}) AND claimed_by = ? AND status = 'sending'""",
+                    (time.time(), *outbox_ids, claimed_by)
+                ).rowcount
+        except Exception as e:
+            self.logger.error(f"Error renewing outbox claim: {e}")
+            return 0
+
+    def complete_outbox(self, claimed_by: str, sent: Iterable[int], retry: Iterable[Tuple[int, float]],
+                        failed: Iterable[int], deferred: Iterable[Tuple[int, float]] = ()) -> bool:
+        """Record the outcome of a claimed batch in one transaction.
+
+        `retry` holds (id, available_at) pairs for rows to try again later;
+        `deferred` holds the same for rows that were never tried, which
+        don't use up an attempt. Rows whose claim went stale and was taken by another dispatcher are
+        left to it.
+        """
+        now = time.time()
+        owned = "claimed_by = ? AND status = 'sending'"
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.executemany(
+                    f"UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ? AND {owned}",
+                    [(now, outbox_id, claimed_by) for outbox_id in sent]
+                )
+                conn.executemany(
+                    f"UPDATE outbox SET status = 'pending', available_at = ?, attempts = attempts + 1 "
+                    f"WHERE id = ? AND {owned}",
+                    [(available_at, outbox_id, claimed_by) for outbox_id, available_at in retry]
+                )
+                conn.executemany(
+                    f"UPDATE outbox SET status = 'pending', available_at = ? WHERE id = ? AND {owned}",
+                    [(available_at, outbox_id, claimed_by) for outbox_id, available_at in deferred]
+                )
+                conn.executemany(
+                    f"UPDATE outbox SET status = 'failed', attempts = attempts + 1 WHERE id = ? AND {owned}",
+                    [(outbox_id, claimed_by) for outbox_id in failed]
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error completing outbox: {e}")
+            return False
+
+    def purge_outbox(self, older_than: float) -> int:
+        """Delete sent and failed notifications older than `older_than` seconds"""
+        cutoff = time.time() - older_than
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                return conn.execute(
+                    "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND created_at < ?",
+                    (cutoff,)
+                ).rowcount
+        except Exception as e:
+            self.logger.error(f"Error purging outbox: {e}")
+            return 0
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, List, Optional, Tuple
+from database import Database
+
+
+class GroupCommitWriter:
+    """Batches alert mutations into a single transaction (group commit).
+
+    Calls made within `window` seconds of each other are committed together
+    with one fsync. Each mutation runs in its own savepoint, so a failing
+    row (e.g. a duplicate alert raising sqlite3.IntegrityError) only fails
+    its own caller's awaitable while the rest of the batch commits.
+    """
+
+    def __init__(self, db: Database, window: float = 0.005, max_batch: int = 500):
+        self.logger = logging.getLogger(__name__)
+        self.db = db
+        self.window = window
+        self.max_batch = max_batch
+        self.pending: List[Tuple[Callable, tuple, asyncio.Future]] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.full: Optional[asyncio.Event] = None
+
+    async def add_alert(self, user_id: int, coin: str, target_price: float, is_greater_than: bool,
+                        hysteresis: Optional[float] = None, cooldown: int = 0) -> bool:
+        """Add new alert; raises sqlite3.IntegrityError if it already exists"""
+        return await self.submit(Database._add_alert, user_id, coin, target_price, is_greater_than,
+                                 hysteresis, cooldown)
+
+    async def remove_alert(self, alert_id: int, user_id: int) -> bool:
+        return await self.submit(Database._remove_alert, alert_id, user_id)
+
+    async def remove_alert_by_index(self, user_id: int, index: int) -> Tuple[bool, Optional[str]]:
+        return await self.submit(Database._remove_alert_by_index, user_id, index)
+
+    async def remove_alert_by_coin(self, user_id: int, coin_id: str) -> bool:
+        return await self.submit(Database._remove_alert_by_coin, user_id, coin_id)
+
+    async def remove_alert_by_user(self, user_id: int) -> bool:
+        return await self.submit(Database._remove_alert_by_user, user_id)
+
+    async def submit(self, mutation: Callable, *args) -> Any:
+        """Queue `mutation(conn, *args)` and wait for its batch to commit"""
+        if self.full is None:
+            self.full = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((mutation, args, future))
+        if len(self.pending) >= self.max_batch:
+            self.full.set()
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_loop())
+        return await future
+
+    async def flush_loop(self):
+        """Commit queued mutations until the queue is empty"""
+        while self.pending:
+            # Collect for one window, or less if the batch fills up
+            try:
+                await asyncio.wait_for(self.full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self.full.clear()
+
+            batch = self.pending[:self.max_batch]
+            del self.pending[:self.max_batch]
+            try:
+                results = await asyncio.to_thread(self.commit, batch)
+            except Exception as e:
+                self.logger.error(f"Error committing {len(batch)} alert mutations: {e}")
+                results = [e] * len(batch)
+
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def commit(self, batch: List[Tuple[Callable, tuple, asyncio.Future]]) -> List[Any]:
+        """Run a batch in one transaction, isolating each row in a savepoint"""
+        results = []
+        conn = sqlite3.connect(self.db.db_name, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for mutation, args, _ in batch:
+                conn.execute('SAVEPOINT mutation')
+                try:
+                    results.append(mutation(conn, *args))
+                except sqlite3.Error as e:
+                    conn.execute('ROLLBACK TO mutation')
+                    results.append(e)
+                conn.execute('RELEASE mutation')
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return results
@@ -1,57 +1,90 @@
-import re
+import sqlite3
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Tuple
 from aiogram import types
-from coin_manager import coin_manager
+from alert_rules import format_cooldown, parse_alert
+from coin_manager import CoinManager
 from database import Database
-from price_checker import price_checker
-from keyboards import keyboards
-from config import config
+from db_writer import GroupCommitWriter
+from price_checker import PriceChecker
+from keyboards import Keyboards
+from config import Config
+
+COINS_UNAVAILABLE = "❌ The coin list is unavailable right now. Please try again in a minute."
 
 
 class AlertHandlers:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, coin_manager: CoinManager, price_checker: PriceChecker,
+                 keyboards: Keyboards, writer: Optional[GroupCommitWriter] = None):
         self.db = db
+        self.coin_manager = coin_manager
+        self.price_checker = price_checker
+        self.keyboards = keyboards
+        self.writer = writer
+        # Last /alerts render per user, served while the user is throttled
+        # user_id -> (rendered alert list, when it was rendered)
+        self.alerts_cache: "OrderedDict[int, Tuple[str, datetime]]" = OrderedDict()
+
+    async def write(self, mutation: str, *args):
+        """Run a Database mutation, through the group-commit writer if enabled"""
+        if self.writer:
+            return await getattr(self.writer, mutation)(*args)
+        return getattr(self.db, mutation)(*args)
+
+    def invalidate_alerts_cache(self, user_id: int):
+        self.alerts_cache.pop(user_id, None)
+
+    async def show_cached_alerts(self, user_id: int, message: types.Message) -> bool:
+        """Answer with the last rendered alert list, if there is one"""
+        cached = self.alerts_cache.get(user_id)
+        if cached is None:
+            return False
+        alert_text, rendered_at = cached
+        await message.answer(
+            f"{alert_text}\n\n🕒 Cached at {rendered_at:%H:%M} UTC, current prices may differ",
+            reply_markup=self.keyboards.main_keyboard()
+        )
+        return True
 
     async def cmd_alert(self, user_id: int, message: types.Message):
         """Handler for /alert command"""
         try:
             # Parse command
-            pattern = r"\/alert\s*([\w\s]+?)\s*([<>])\s*(\d*\.?\d+)"
-            match = re.match(pattern, message.text)
-            if match:
-                coin = match.group(1).strip()
-                operator = match.group(2)
-                price = float(match.group(3))
-            else:
-                raise ValueError(
-                    "❌ Invalid format. Use:\n"
-                    "/alert BTC > 100000\n"
-                    "/alert ETH < 2000"
-                )
-
-            is_greater_than = operator == ">"
+            coin, is_greater_than, price, hysteresis, cooldown = parse_alert(message.text)
 
             # Check alerts limit
-            if self.db.get_alerts_count(user_id) >= config.MAX_ALERTS_PER_USER:
-                raise ValueError(f"❌ Maximum {config.MAX_ALERTS_PER_USER} alerts allowed")
+            if self.db.get_alerts_count(user_id) >= Config.MAX_ALERTS_PER_USER:
+                raise ValueError(f"❌ Maximum {Config.MAX_ALERTS_PER_USER} alerts allowed")
 
-            coin_id = coin_manager.get_coin_id(coin)
+            if not await self.coin_manager.load():
+                raise ValueError(COINS_UNAVAILABLE)
+            coin_id = self.coin_manager.get_coin_id(coin)
             # Validate coin
             if not coin_id:
                 raise ValueError(f"❌ Invalid coin: {coin}")
 
             # Get current price
-            current_price = await price_checker.get_price(coin_id)
+            current_price = await self.price_checker.get_price(coin_id)
             if not current_price:
                 raise ValueError("❌ Error fetching price. Please try again.")
 
             # Add alert
-            if self.db.add_alert(user_id, coin_id, price, is_greater_than):
+            try:
+                added = await self.write("add_alert", user_id, coin_id, price, is_greater_than,
+                                         hysteresis, cooldown)
+            except sqlite3.IntegrityError:
+                added = False
+
+            if added:
+                self.invalidate_alerts_cache(user_id)
                 await message.answer(
-                    f"✅ Alert set: {coin_manager.get_coin_name(coin_id)} "
+                    f"✅ Alert set: {self.coin_manager.get_coin_name(coin_id)} "
                     f"{'>' if is_greater_than else '<'} "
-                    f"{price_checker.format_price(price)}\n"
-                    f"Current price: {price_checker.format_price(current_price)}",
-                    reply_markup=keyboards.main_keyboard()
+                    f"{self.price_checker.format_price(price)}"
+                    f"{f' 🔁 (re-arms at {hysteresis:.2%} band, at most every {format_cooldown(cooldown)})' if hysteresis else ''}\n"
+                    f"Current price: {self.price_checker.format_price(current_price)}",
+                    reply_markup=self.keyboards.main_keyboard()
                 )
             else:
                 raise ValueError("❌ This alert already exists")
@@ -67,28 +100,33 @@ class AlertHandlers:
             coin = " ".join(message.text.split()[1:])
             if not coin:
                 raise ValueError()
+            if not await self.coin_manager.load():
+                await message.answer(COINS_UNAVAILABLE)
+                return
             if coin.isdigit():
                 index = int(coin) - 1
-                success, coin_id = self.db.remove_alert_by_index(user_id, index)
+                success, coin_id = await self.write("remove_alert_by_index", user_id, index)
                 if success:
+                    self.invalidate_alerts_cache(user_id)
                     await message.answer(
-                        f"✅ Alert for {coin_manager.get_coin_name(coin_id)} removed",
-                        reply_markup=keyboards.main_keyboard()
+                        f"✅ Alert for {self.coin_manager.get_coin_name(coin_id)} removed",
+                        reply_markup=self.keyboards.main_keyboard()
                     )
                 else:
                     await message.answer(f"❌ Invalid alert number: {coin}")
             else:
-                coin_id = coin_manager.get_coin_id(coin)
+                coin_id = self.coin_manager.get_coin_id(coin)
                 if coin_id:
-                    if self.db.remove_alert_by_coin(user_id, coin_id):
+                    if await self.write("remove_alert_by_coin", user_id, coin_id):
+                        self.invalidate_alerts_cache(user_id)
                         await message.answer(
-                            f"✅ Alerts for {coin_manager.get_coin_name(coin_id)} are removed",
-                            reply_markup=keyboards.main_keyboard()
+                            f"✅ Alerts for {self.coin_manager.get_coin_name(coin_id)} are removed",
+                            reply_markup=self.keyboards.main_keyboard()
                         )
                     else:
                         await message.answer(
                             f"❌No active alerts for {coin}",
-                            reply_markup=keyboards.main_keyboard()
+                            reply_markup=self.keyboards.main_keyboard()
                         )
                 else:
                     await message.answer(f"❌ Invalid coin: {coin}")
@@ -110,26 +148,27 @@ class AlertHandlers:
             if not user_alerts:
                 await message.answer(
                     "📝 You don't have any active alerts.",
-                    reply_markup=keyboards.set_alert_keyboard()
+                    reply_markup=self.keyboards.set_alert_keyboard()
                 )
                 return
 
             # Try to remove all alerts
-            if self.db.remove_alert_by_user(user_id):
+            if await self.write("remove_alert_by_user", user_id):
+                self.invalidate_alerts_cache(user_id)
                 await message.answer(
                     f"✅ Successfully removed {len(user_alerts)} alerts.",
-                    reply_markup=keyboards.main_keyboard()
+                    reply_markup=self.keyboards.main_keyboard()
                 )
             else:
                 await message.answer(
                     "❌ Failed to remove alerts. Please try again.",
-                    reply_markup=keyboards.main_keyboard()
+                    reply_markup=self.keyboards.main_keyboard()
                 )
 
         except Exception as e:
             await message.answer(
                 "❌ Something went wrong. Please try again later.",
-                reply_markup=keyboards.main_keyboard()
+                reply_markup=self.keyboards.main_keyboard()
             )
 
     async def show_alerts(self, user_id: int, message: types.Message):
@@ -139,29 +178,39 @@ class AlertHandlers:
         if not alerts:
             await message.answer(
                 "No active alerts.\nUse /alert to set one!",
-                reply_markup=keyboards.set_alert_keyboard()
+                reply_markup=self.keyboards.set_alert_keyboard()
             )
             return
 
         try:
+            if not await self.coin_manager.load():
+                await message.answer(COINS_UNAVAILABLE)
+                return
+
             # Get current prices
             coin_ids = list(set(alert[1] for alert in alerts))
-            prices = await price_checker.get_prices(coin_ids)
+            prices = await self.price_checker.get_prices(coin_ids)
 
             # Format alerts
             alert_text = "📊 Your Alerts:\n\n"
-            for i, (_, coin_id, target, is_greater, created_at) in enumerate(alerts, 1):
+            for i, (_, coin_id, target, is_greater, created_at, hysteresis) in enumerate(alerts, 1):
                 current_price = prices.get(coin_id)
                 if current_price:
                     alert_text += (
-                        f"{i}. {coin_manager.get_coin_name(coin_id)} "
+                        f"{i}. {self.coin_manager.get_coin_name(coin_id)} "
                         f"{'>' if is_greater else '<'} "
-                        f"{price_checker.format_price(target)}\n"
-                        f"Current: {price_checker.format_price(current_price)}\n\n"
+                        f"{self.price_checker.format_price(target)}"
+                        f"{' 🔁' if hysteresis else ''}\n"
+                        f"Current: {self.price_checker.format_price(current_price)}\n\n"
                     )
 
             alert_text += "Remove alert: /remove <number>\n"
             alert_text += "Remove alerts: /remove <coin>"
-            await message.answer(alert_text, reply_markup=keyboards.main_keyboard())
+
+            self.alerts_cache[user_id] = (alert_text, datetime.now(timezone.utc))
+            self.alerts_cache.move_to_end(user_id)
+            if len(self.alerts_cache) > Config.THROTTLE_MAX_USERS:
+                self.alerts_cache.popitem(last=False)
+            await message.answer(alert_text, reply_markup=self.keyboards.main_keyboard())
         except Exception as e:
             await message.answer("❌ Error fetching current prices")
@@ -47,5 +47,3 @@ class Keyboards:
                 InlineKeyboardButton(text="❌ No", callback_data="cancel_remove")
             ]
         ])
-
-keyboards = Keyboards()
\ No newline at end of file
@@ -0,0 +1,200 @@
+import logging
+import os
+import socket
+import sqlite3
+import json
+import time
+import uuid
+import zlib
+from typing import List, Optional
+
+
+class CheckerLease:
+    """Coordinates alert checking between bot instances sharing one database.
+
+    Every instance heartbeats into the ``checker_instances`` table. In
+    ``leader`` mode a single instance holds the ``checker`` row of the
+    ``leases`` table and is the only one evaluating alerts; a standby takes
+    the lease over once the holder stops renewing it. In ``partition`` mode
+    every live instance checks the coins that hash onto its slot, and the
+    lease only picks the instance running housekeeping.
+
+    Partition membership is versioned in the ``checker_partitions`` table.
+    When the set of live instances changes, the instance that notices bumps
+    the generation and schedules the new member list to take effect one
+    ``interval`` later. Every live instance reads the row on its next
+    heartbeat, before the switch, so all of them move to the new slots at
+    the same moment instead of each acting on its own view of who is alive.
+    The remaining window is a dead instance's coins, which go unchecked
+    until its heartbeat expires (``ttl``) plus one interval, and clock skew
+    between hosts around the switch.
+    """
+
+    LEASE_NAME = "checker"
+    MODES = ("leader", "partition")
+
+    def __init__(self, db_name: str, mode: str = "leader", ttl: int = 90, interval: float = 30,
+                 instance_id: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown checker mode: {mode}")
+        self.logger = logging.getLogger(__name__)
+        self.db_name = db_name
+        self.mode = mode
+        self.ttl = ttl
+        self.interval = interval
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.generation = 0
+        self.members: List[str] = []
+        self.previous: List[str] = []
+        self.switch_at = 0.0
+        self.setup_tables()
+
+    def setup_tables(self):
+        """Create the lease and heartbeat tables if they don't exist"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS leases (
+                        name TEXT PRIMARY KEY,
+                        holder TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS checker_instances (
+                        instance_id TEXT PRIMARY KEY,
+                        heartbeat_at REAL NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS checker_partitions (
+                        name TEXT PRIMARY KEY,
+                        generation INTEGER NOT NULL,
+                        members TEXT NOT NULL,
+                        previous TEXT NOT NULL,
+                        switch_at REAL NOT NULL
+                    )
+                ''')
+        except Exception as e:
+            self.logger.error(f"Lease setup error: {e}")
+            raise
+
+    def heartbeat(self) -> bool:
+        """Renew this instance's heartbeat and lease.
+
+        Returns True when this instance should run the checker this tick.
+        A failed heartbeat drops leadership rather than risking two active
+        checkers. It blocks for up to half an interval on a locked database,
+        so async callers run it in a worker thread.
+        """
+        now = time.time()
+        try:
+            with sqlite3.connect(self.db_name, timeout=min(self.ttl / 3, self.interval / 2)) as conn:
+                conn.execute(
+                    '''INSERT INTO checker_instances (instance_id, heartbeat_at) VALUES (?, ?)
+                       ON CONFLICT(instance_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at''',
+                    (self.instance_id, now)
+                )
+                conn.execute(
+                    'DELETE FROM checker_instances WHERE heartbeat_at < ?',
+                    (now - self.ttl,)
+                )
+                self._renew_leader(conn, now)
+                if self.mode == "partition":
+                    self._refresh_partition(conn, now)
+        except Exception as e:
+            self.logger.error(f"Error renewing checker lease: {e}")
+            self.is_leader = False
+            self.members = self.previous = []
+            return False
+
+        return self.is_leader if self.mode == "leader" else True
+
+    def _renew_leader(self, conn: sqlite3.Connection, now: float):
+        # Take the lease if it is free, expired or already ours; the WHERE
+        # clause keeps a live holder's row untouched.
+        conn.execute(
+            '''INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT(name) DO UPDATE SET
+                   holder = excluded.holder,
+                   expires_at = excluded.expires_at
+               WHERE leases.holder = excluded.holder OR leases.expires_at < ?''',
+            (self.LEASE_NAME, self.instance_id, now + self.ttl, now)
+        )
+        holder = conn.execute(
+            'SELECT holder FROM leases WHERE name = ?', (self.LEASE_NAME,)
+        ).fetchone()[0]
+
+        was_leader = self.is_leader
+        self.is_leader = holder == self.instance_id
+        if self.is_leader and not was_leader:
+            self.logger.info(f"Instance {self.instance_id} acquired checker lease")
+        elif was_leader and not self.is_leader:
+            self.logger.warning(f"Instance {self.instance_id} lost checker lease to {holder}")
+
+    def _refresh_partition(self, conn: sqlite3.Connection, now: float):
+        live = [row[0] for row in conn.execute(
+            'SELECT instance_id FROM checker_instances ORDER BY instance_id'
+        ).fetchall()]
+        row = conn.execute(
+            'SELECT generation, members, previous, switch_at FROM checker_partitions WHERE name = ?',
+            (self.LEASE_NAME,)
+        ).fetchone()
+        if row is None:
+            # First instance up; nobody else is checking yet
+            generation, members, previous, switch_at = 1, live, live, now
+        else:
+            generation, members, previous, switch_at = row[0], json.loads(row[1]), json.loads(row[2]), row[3]
+
+        if row is None or members != live:
+            if row is not None:
+                # Members still in effect keep their slots until the switch
+                previous = members if now >= switch_at else previous
+                generation, members, switch_at = generation + 1, live, now + self.interval
+            # The heartbeat's writes above already hold the write lock, so
+            # only one instance bumps the generation at a time
+            conn.execute(
+                '''INSERT INTO checker_partitions (name, generation, members, previous, switch_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET
+                       generation = excluded.generation,
+                       members = excluded.members,
+                       previous = excluded.previous,
+                       switch_at = excluded.switch_at''',
+                (self.LEASE_NAME, generation, json.dumps(members), json.dumps(previous), switch_at)
+            )
+
+        if generation != self.generation:
+            self.logger.info(f"Checker partition generation {generation}: {len(members)} live instance(s)")
+        self.generation, self.members, self.previous, self.switch_at = generation, members, previous, switch_at
+
+    def owns(self, coin_id: str, now: Optional[float] = None) -> bool:
+        """Whether this instance is responsible for checking a coin"""
+        if self.mode == "leader":
+            return self.is_leader
+        members = self.members if (now or time.time()) >= self.switch_at else self.previous
+        if self.instance_id not in members:
+            return False
+        return zlib.crc32(coin_id.encode()) % len(members) == members.index(self.instance_id)
+
+    @property
+    def runs_housekeeping(self) -> bool:
+        """Whether this instance runs once-per-deployment jobs like snapshots"""
+        return self.is_leader
+
+    def release(self):
+        """Give up the lease and heartbeat so a standby can take over at once"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.execute(
+                    'DELETE FROM leases WHERE name = ? AND holder = ?',
+                    (self.LEASE_NAME, self.instance_id)
+                )
+                conn.execute(
+                    'DELETE FROM checker_instances WHERE instance_id = ?',
+                    (self.instance_id,)
+                )
+        except Exception as e:
+            self.logger.error(f"Error releasing checker lease: {e}")
+        self.is_leader = False
@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from config import Config
+from handlers.alerts import AlertHandlers
+from rate_limit import TokenBucket, TokenBuckets
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Per-user token bucket rate limiting for messages and callbacks.
+
+    Buckets live in memory and the least recently seen users are evicted
+    once `max_users` is reached. The first throttled `/alerts` request of
+    a throttled stretch is answered from the last render; after that the
+    user gets one warning and further requests are dropped silently.
+    """
+
+    CACHED_COMMANDS = ("alerts", "view_alerts")
+
+    def __init__(self, alert_handlers: AlertHandlers,
+                 rate: float = Config.THROTTLE_RATE,
+                 capacity: float = Config.THROTTLE_CAPACITY,
+                 costs: Optional[Dict[str, float]] = None,
+                 max_users: int = Config.THROTTLE_MAX_USERS):
+        self.alert_handlers = alert_handlers
+        self.rate = rate
+        self.capacity = capacity
+        self.costs = costs if costs is not None else Config.THROTTLE_COSTS
+        self.buckets = TokenBuckets(capacity, max_users)
+
+    @staticmethod
+    def get_command(event: TelegramObject) -> Optional[str]:
+        """Get the command name (or callback data) an event is asking for"""
+        if isinstance(event, CallbackQuery):
+            return event.data
+        if isinstance(event, Message) and event.text and event.text.startswith("/"):
+            return event.text.split()[0][1:].split("@")[0].lower()
+        return None
+
+    def get_bucket(self, user_id: int) -> TokenBucket:
+        return self.buckets.get(user_id)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        command = self.get_command(event)
+        cost = self.costs.get(command, self.costs.get("default", 1))
+        bucket = self.get_bucket(user.id)
+        if bucket.consume(cost, self.rate, self.capacity):
+            return await handler(event, data)
+
+        # Overloaded: serve the last /alerts render once, if we have one
+        message = event.message if isinstance(event, CallbackQuery) else event
+        if (command in self.CACHED_COMMANDS and not bucket.served_cached
+                and await self.alert_handlers.show_cached_alerts(user.id, message)):
+            bucket.serve_cached_once()
+            if isinstance(event, CallbackQuery):
+                await event.answer()
+            return None
+
+        # Warn once per throttled stretch, then drop silently. Callbacks must
+        # always be answered; that shows a toast, not a new message.
+        if bucket.warn_once() or isinstance(event, CallbackQuery):
+            await event.answer("⏳ Too many requests, please slow down.")
+        return None
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from config import Config
+from database import Database
+from keyboards import Keyboards
+
+
+class OutboxDispatcher:
+    """Delivers queued alert notifications from the `outbox` table.
+
+    check_alerts only writes notifications to the outbox, in the same
+    transaction that removes the fired alerts. This dispatcher claims due
+    rows in batches, sends them and records the outcomes with one batched
+    update, so a restart resumes delivery where it stopped. The claim on
+    the unsent rest of the batch is renewed before every message, so a
+    batch that is still sending is never re-claimed by another instance,
+    and outcomes are only recorded for rows this dispatcher still owns. A
+    crash between sending and recording can resend at most one batch, once
+    the claim goes stale.
+    """
+
+    def __init__(self, db: Database, bot: Bot, keyboards: Keyboards, instance_id: str,
+                 batch_size: int = Config.OUTBOX_BATCH_SIZE,
+                 max_attempts: int = Config.OUTBOX_MAX_ATTEMPTS):
+        self.logger = logging.getLogger(__name__)
+        self.db = db
+        self.bot = bot
+        self.keyboards = keyboards
+        self.instance_id = instance_id
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.wakeup: Optional[asyncio.Event] = None
+        self.last_purge = 0.0
+
+    def wake(self):
+        """Deliver newly queued notifications without waiting for the poll"""
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def run(self):
+        """Background task draining the outbox"""
+        self.wakeup = asyncio.Event()
+        while True:
+            try:
+                while await self.drain():
+                    pass
+            except Exception as e:
+                self.logger.error(f"Error draining outbox: {e}")
+
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), Config.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    def purge(self):
+        """Delete old delivered notifications, at most once per retention period"""
+        if time.time() - self.last_purge >= Config.OUTBOX_RETENTION:
+            self.db.purge_outbox(Config.OUTBOX_RETENTION)
+            self.last_purge = time.time()
+
+    async def drain(self) -> int:
+        """Send one claimed batch; returns how many rows were claimed"""
+        batch = self.db.claim_outbox(self.instance_id, self.batch_size, Config.OUTBOX_CLAIM_TIMEOUT)
+        if not batch:
+            return 0
+
+        sent: List[int] = []
+        retry: List[Tuple[int, float]] = []
+        deferred: List[Tuple[int, float]] = []
+        failed: List[int] = []
+        for i, (outbox_id, user_id, text, attempts) in enumerate(batch):
+            rest = [row[0] for row in batch[i:]]
+            if i and self.db.renew_outbox_claim(self.instance_id, rest) < len(rest):
+                # Our claim went stale and another dispatcher took over
+                self.logger.warning(f"Lost outbox claim on {len(rest)} message(s); leaving them")
+                break
+            try:
+                await self.bot.send_message(user_id, text, reply_markup=self.keyboards.main_keyboard(),
+                                            request_timeout=Config.OUTBOX_SEND_TIMEOUT)
+                sent.append(outbox_id)
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot; retry the rest later.
+                # Only this message was attempted.
+                available_at = time.time() + e.retry_after
+                retry.append((outbox_id, available_at))
+                deferred.extend((row[0], available_at) for row in batch[i + 1:])
+                break
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                self.logger.error(f"Dropping message to user {user_id}: {e}")
+                failed.append(outbox_id)
+            except Exception as e:
+                self.logger.error(f"Error sending message to user {user_id}: {e}")
+                if attempts + 1 >= self.max_attempts:
+                    failed.append(outbox_id)
+                else:
+                    retry.append((outbox_id, time.time() + Config.OUTBOX_RETRY_DELAY * 2 ** attempts))
+
+        self.db.complete_outbox(self.instance_id, sent, retry, failed, deferred)
+        return len(batch)
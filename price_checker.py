@@ -1,17 +1,23 @@
 import logging
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
-from pycoingecko import CoinGeckoAPI
-from config import config
+from config import Config
 
 
 class PriceChecker:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.cg = CoinGeckoAPI()
+        self._cg = None
         self.price_cache: Dict[str, Dict] = {}
         self.last_update: Optional[datetime] = None
 
+    @property
+    def cg(self):
+        if self._cg is None:
+            from pycoingecko import CoinGeckoAPI
+            self._cg = CoinGeckoAPI()
+        return self._cg
+
     async def get_prices(self, coin_ids: List[str]) -> Dict[str, float]:
         """Get current prices for multiple coins with caching"""
         try:
@@ -20,7 +26,7 @@ class PriceChecker:
             # First try to get prices from cache
             for coin_id in coin_ids:
                 if (self.last_update and
-                        datetime.now() - self.last_update <= timedelta(seconds=config.PRICE_CACHE_TIME) and
+                        datetime.now() - self.last_update <= timedelta(seconds=Config.PRICE_CACHE_TIME) and
                         coin_id in self.price_cache):
                     result_prices[coin_id] = self.price_cache[coin_id]['usd']
 
@@ -64,6 +70,3 @@ class PriceChecker:
             return f"${price:.2f}"
         else:
             return f"${price:,.2f}"
-
-
-price_checker = PriceChecker()
\ No newline at end of file
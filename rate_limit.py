@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Tokens refill at `rate` per second up to `capacity`.
+
+    A throttled stretch lasts from the first rejected request until the
+    next accepted one; `warned` and `served_cached` record what the user
+    was already sent during it.
+    """
+
+    __slots__ = ("tokens", "updated_at", "warned", "served_cached")
+
+    def __init__(self, capacity: float):
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.warned = False
+        self.served_cached = False
+
+    def consume(self, cost: float, rate: float, capacity: float) -> bool:
+        """Refill for the elapsed time and take `cost` tokens if available"""
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            self.warned = False
+            self.served_cached = False
+            return True
+        return False
+
+    def warn_once(self) -> bool:
+        """Whether to warn about this rejection; True once per throttled stretch"""
+        warned, self.warned = self.warned, True
+        return not warned
+
+    def serve_cached_once(self) -> bool:
+        """Whether to answer from cache; True once per throttled stretch"""
+        served, self.served_cached = self.served_cached, True
+        return not served
+
+
+class TokenBuckets:
+    """Per-user buckets, evicting the least recently seen user past `max_users`"""
+
+    def __init__(self, capacity: float, max_users: int):
+        self.capacity = capacity
+        self.max_users = max_users
+        self.buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.buckets
+
+    def get(self, user_id: int) -> TokenBucket:
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            bucket = self.buckets[user_id] = TokenBucket(self.capacity)
+            if len(self.buckets) > self.max_users:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(user_id)
+        return bucket
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+
+
+class TickScheduler:
+    """Runs a loop body on a fixed grid of monotonic-clock deadlines.
+
+    Sleeping for the interval after each run drifts by the run's duration.
+    Here tick N is due at start + N * interval, whatever the previous tick
+    took. A tick that runs past one or more deadlines counts as an overrun:
+    the missed ticks are merged into a single tick that starts right away,
+    and then the loop rejoins the grid. Ticks never queue up behind a slow
+    one.
+    """
+
+    def __init__(self, interval: float, overload_ratio: float = 0.8):
+        self.logger = logging.getLogger(__name__)
+        self.interval = interval
+        self.overload_ratio = overload_ratio
+        self.ticks_run = 0
+        self.overruns = 0
+        self.missed_ticks = 0
+        self.last_duration = 0.0
+
+    @property
+    def overloaded(self) -> bool:
+        """Whether the last tick used most of its interval; shed optional work"""
+        return self.last_duration >= self.interval * self.overload_ratio
+
+    async def ticks(self) -> AsyncIterator[int]:
+        """Yield once per tick; the loop body is the tick's work"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            started = loop.time()
+            yield self.ticks_run
+            now = loop.time()
+            self.ticks_run += 1
+            self.last_duration = now - started
+
+            deadline += self.interval
+            if now >= deadline:
+                # Every tick due by now is merged into one that starts at once
+                due = int((now - deadline) // self.interval) + 1
+                self.overruns += 1
+                self.missed_ticks += due - 1
+                self.logger.warning(
+                    f"Tick took {self.last_duration:.1f}s, over its {self.interval}s interval; "
+                    f"merging {due} due tick(s) ({self.overruns} overruns so far)"
+                )
+                # The merged tick's deadline is the next one on the grid
+                deadline += (due - 1) * self.interval
+                continue
+
+            await asyncio.sleep(deadline - now)
@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# The bot's modules live at the repository root
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
@@ -0,0 +1,85 @@
+import pytest
+
+from alert_rules import check_alert, format_cooldown, parse_alert
+from config import Config
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("/alert BTC > 100000", ("BTC", True, 100000, None, 0)),
+    ("/alert eth<2000.5", ("eth", False, 2000.5, None, 0)),
+    ("/alert bitcoin cash < .5", ("bitcoin cash", False, 0.5, None, 0)),
+    ("/alert BTC > 100 repeat", ("BTC", True, 100, Config.ALERT_HYSTERESIS, Config.ALERT_COOLDOWN)),
+    ("/alert BTC > 100 repeat 2%", ("BTC", True, 100, 0.02, Config.ALERT_COOLDOWN)),
+    ("/alert BTC > 100 repeat 2", ("BTC", True, 100, 0.02, Config.ALERT_COOLDOWN)),
+    ("/alert BTC > 100 repeat 2.5 %", ("BTC", True, 100, 0.025, Config.ALERT_COOLDOWN)),
+    ("/alert BTC > 100 repeat 2% 30m", ("BTC", True, 100, 0.02, 30 * 60)),
+    ("/alert BTC > 100 REPEAT 2 1D", ("BTC", True, 100, 0.02, 24 * 60 * 60)),
+    # A lone number with a unit is the cooldown, with the default band
+    ("/alert BTC > 100 repeat 5m", ("BTC", True, 100, Config.ALERT_HYSTERESIS, 5 * 60)),
+    ("/alert BTC > 100 repeat 2 h", ("BTC", True, 100, Config.ALERT_HYSTERESIS, 2 * 60 * 60)),
+    ("/alert BTC > 100 repeat 0s", ("BTC", True, 100, Config.ALERT_HYSTERESIS, 0)),
+])
+def test_parse_alert(text, expected):
+    coin, is_greater, price, hysteresis, cooldown = parse_alert(text)
+    assert (coin, is_greater, cooldown) == (expected[0], expected[1], expected[4])
+    assert price == pytest.approx(expected[2])
+    if expected[3] is None:
+        assert hysteresis is None
+    else:
+        assert hysteresis == pytest.approx(expected[3])
+
+
+@pytest.mark.parametrize("text", [
+    "/alert BTC 100000",
+    "/alert BTC > 100 please",
+    "/alert BTC > 100 repeat 2 x",
+    "/alert BTC > 100 repeat2",
+    "/alert BTC > 100 repeat 2% 30",
+    "/alert BTC > 100 repeat 2% 30w",
+    "/alert BTC > 100 2%",
+])
+def test_parse_alert_rejects_malformed_commands(text):
+    with pytest.raises(ValueError, match="Invalid format"):
+        parse_alert(text)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("/alert BTC > 100 repeat 0", "Repeat band"),
+    ("/alert BTC > 100 repeat 51%", "Repeat band"),
+    ("/alert BTC > 100 repeat 2% 8d", "Repeat cooldown"),
+])
+def test_parse_alert_rejects_out_of_range_repeat(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_alert(text)
+
+
+@pytest.mark.parametrize("seconds, text", [
+    (0, "0s"), (45, "45s"), (90, "90s"), (1800, "30m"), (3600, "1h"), (5400, "90m"), (2 * 86400, "2d"),
+])
+def test_format_cooldown(seconds, text):
+    assert format_cooldown(seconds) == text
+
+
+def alert(target=100.0, is_greater=True, armed=1, threshold=100.0, ready_at=0):
+    return 1, 1, 1, target, is_greater, armed, threshold, ready_at
+
+
+def test_check_alert_fires_armed_alerts_past_the_target():
+    assert check_alert(alert(), 101, now=1000) == "fire"
+    assert check_alert(alert(), 100, now=1000) is None
+    assert check_alert(alert(is_greater=False), 99, now=1000) == "fire"
+    assert check_alert(alert(is_greater=False), 101, now=1000) is None
+
+
+def test_check_alert_waits_for_the_cooldown():
+    assert check_alert(alert(ready_at=1001), 101, now=1000) is None
+    assert check_alert(alert(ready_at=1000), 101, now=1000) == "fire"
+
+
+def test_check_alert_rearms_only_past_the_band():
+    above = alert(armed=0, threshold=98.0)
+    assert check_alert(above, 99, now=1000) is None  # still inside the band
+    assert check_alert(above, 97, now=1000) == "rearm"
+    below = alert(is_greater=False, armed=0, threshold=102.0)
+    assert check_alert(below, 101, now=1000) is None
+    assert check_alert(below, 103, now=1000) == "rearm"
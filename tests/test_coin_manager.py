@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from coin_manager import CoinManager
+from database import Database
+
+
+class SlowCoinGecko:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def get_coins_list(self):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.fail:
+            raise ConnectionError("CoinGecko is down")
+        return [{"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"}]
+
+
+def manager_with(tmp_path, cg):
+    manager = CoinManager(Database(str(tmp_path / "alerts.db")))
+    manager._cg = cg
+    return manager
+
+
+def test_load_fetches_once_without_blocking_the_loop(tmp_path):
+    cg = SlowCoinGecko()
+    manager = manager_with(tmp_path, cg)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(manager.load(), manager.load(), manager.load())
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert cg.calls == 1
+    assert ticks >= 10  # the loop kept running during the fetch
+    assert manager.get_coin_id("BTC") == "bitcoin"
+    assert manager.get_coin_name("bitcoin") == "Bitcoin"
+
+
+def test_failed_load_backs_off_and_lookups_never_fetch(tmp_path):
+    cg = SlowCoinGecko(fail=True)
+    manager = manager_with(tmp_path, cg)
+
+    assert asyncio.run(manager.load()) is False
+    assert asyncio.run(manager.load()) is False
+    assert cg.calls == 1
+    assert manager.get_coin_id("bitcoin") is None
+    assert manager.get_coin_name("bitcoin") == "bitcoin"
+    assert cg.calls == 1
+
+
+def test_warm_up_runs_one_background_load_at_a_time(tmp_path):
+    cg = SlowCoinGecko()
+    manager = manager_with(tmp_path, cg)
+
+    async def scenario():
+        first = manager.warm_up()
+        assert manager.warm_up() is first
+        assert not manager.loaded  # names fall back to coin ids meanwhile
+        assert manager.get_coin_name("bitcoin") == "bitcoin"
+        return await first
+
+    assert asyncio.run(scenario()) is True
+    assert manager.loaded
+    assert cg.calls == 1
@@ -0,0 +1,53 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from database import Database
+from db_writer import GroupCommitWriter
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "alerts.db"))
+
+
+def run_batch(writer, *calls):
+    async def submit_all():
+        return await asyncio.gather(*(call(writer) for call in calls), return_exceptions=True)
+    return asyncio.run(submit_all())
+
+
+def test_duplicate_fails_only_its_own_row(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    writer = GroupCommitWriter(db, window=0.05)
+
+    results = run_batch(
+        writer,
+        lambda w: w.add_alert(1, "ethereum", 2000, False),
+        lambda w: w.add_alert(1, "bitcoin", 100000, True),  # already stored
+        lambda w: w.add_alert(2, "bitcoin", 100000, True),
+        lambda w: w.add_alert(2, "bitcoin", 100000, True),  # duplicate within the batch
+        lambda w: w.remove_alert_by_coin(3, "bitcoin"),
+    )
+
+    assert results[0] is True
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert results[2] is True
+    assert isinstance(results[3], sqlite3.IntegrityError)
+    assert results[4] is False
+    assert [alert[1] for alert in db.get_user_alerts(1)] == ["bitcoin", "ethereum"]
+    assert [alert[1] for alert in db.get_user_alerts(2)] == ["bitcoin"]
+
+
+def test_batch_commits_in_one_transaction(db, monkeypatch):
+    writer = GroupCommitWriter(db, window=0.05)
+    batches = []
+    commit = writer.commit
+    monkeypatch.setattr(writer, "commit", lambda batch: batches.append(len(batch)) or commit(batch))
+
+    results = run_batch(writer, *(lambda w, i=i: w.add_alert(i, "bitcoin", 100000, True) for i in range(20)))
+
+    assert results == [True] * 20
+    assert batches == [20]
+    assert sum(db.get_alerts_count(i) for i in range(20)) == 20
@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+
+import pytest
+
+from lease import CheckerLease
+
+TTL = 2
+INTERVAL = 0.2
+COINS = [f"coin-{i}" for i in range(50)]
+
+
+def run_instance(db_name, mode, instance_id):
+    lease = CheckerLease(db_name, mode=mode, ttl=TTL, interval=INTERVAL, instance_id=instance_id)
+    while True:
+        lease.heartbeat()
+        time.sleep(INTERVAL)
+
+
+def holder(db_name):
+    try:
+        with sqlite3.connect(db_name) as conn:
+            row = conn.execute('SELECT holder FROM leases WHERE name = ?', (CheckerLease.LEASE_NAME,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row and row[0]
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(INTERVAL / 4)
+    return False
+
+
+@pytest.fixture
+def leader_process(tmp_path):
+    """A separate process that takes the lease first, killed by the test"""
+    db_name = str(tmp_path / "alerts.db")
+    processes = []
+
+    def start(mode):
+        process = multiprocessing.get_context("fork").Process(
+            target=run_instance, args=(db_name, mode, "a-leader"), daemon=True
+        )
+        process.start()
+        processes.append(process)
+        return process
+
+    yield db_name, start
+    for process in processes:
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+
+def test_standby_takes_over_after_leader_is_killed(leader_process):
+    db_name, start = leader_process
+    leader = start("leader")
+    assert wait_for(lambda: holder(db_name) == "a-leader", TTL), "leader never took the lease"
+    standby = CheckerLease(db_name, mode="leader", ttl=TTL, interval=INTERVAL, instance_id="b-standby")
+    assert not standby.heartbeat()
+    assert not standby.runs_housekeeping
+    assert not any(standby.owns(coin) for coin in COINS)
+
+    os.kill(leader.pid, signal.SIGKILL)
+    leader.join()
+    killed_at = time.monotonic()
+
+    assert wait_for(standby.heartbeat, TTL + 2 * INTERVAL)
+    assert time.monotonic() - killed_at <= TTL + 2 * INTERVAL
+    assert standby.runs_housekeeping
+    assert all(standby.owns(coin) for coin in COINS)
+
+
+def test_partition_survivor_owns_every_coin(leader_process):
+    db_name, start = leader_process
+    first = start("partition")
+    assert wait_for(lambda: holder(db_name) == "a-leader", TTL), "first instance never started"
+    survivor = CheckerLease(db_name, mode="partition", ttl=TTL, interval=INTERVAL, instance_id="b-survivor")
+
+    def split_in_two():
+        survivor.heartbeat()
+        return len(survivor.members) == 2 and time.time() >= survivor.switch_at
+
+    assert wait_for(split_in_two, TTL), "instances never agreed on a two-way split"
+    assert not survivor.runs_housekeeping
+    owned = [coin for coin in COINS if survivor.owns(coin)]
+    assert 0 < len(owned) < len(COINS)
+
+    os.kill(first.pid, signal.SIGKILL)
+    first.join()
+
+    def owns_everything():
+        survivor.heartbeat()
+        return all(survivor.owns(coin) for coin in COINS)
+
+    # The dead heartbeat expires after TTL; the new split applies one interval later
+    assert wait_for(owns_everything, TTL + 3 * INTERVAL)
+    assert survivor.runs_housekeeping
+
+
+def test_partition_switch_is_deferred_until_every_instance_has_seen_it(tmp_path):
+    db_name = str(tmp_path / "alerts.db")
+    a = CheckerLease(db_name, mode="partition", ttl=TTL, interval=60, instance_id="a")
+    a.heartbeat()
+    assert all(a.owns(coin) for coin in COINS)
+
+    b = CheckerLease(db_name, mode="partition", ttl=TTL, interval=60, instance_id="b")
+    b.heartbeat()
+    a.heartbeat()
+    now = time.time()
+    # Before the switch the old split stands: a owns everything, b nothing
+    assert all(a.owns(coin, now) for coin in COINS)
+    assert not any(b.owns(coin, now) for coin in COINS)
+
+    # After it both use the same generation, and every coin has one owner
+    later = now + 61
+    assert a.generation == b.generation
+    assert all(a.owns(coin, later) != b.owns(coin, later) for coin in COINS)
@@ -0,0 +1,45 @@
+import sqlite3
+import time
+from datetime import datetime
+from os import listdir, makedirs
+
+from backup import Snapshotter
+from database import Database
+
+
+def test_legacy_alerts_are_migrated_and_old_snapshots_archived(tmp_path):
+    db_name = str(tmp_path / "alerts.db")
+    created = datetime(2024, 1, 15, 12, 30, 0)  # naive local time, as the old schema stored it
+    with sqlite3.connect(db_name) as conn:
+        conn.execute('''
+            CREATE TABLE alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                coin TEXT,
+                target_price REAL,
+                is_greater_than BOOLEAN,
+                created_at TIMESTAMP
+            )
+        ''')
+        conn.execute(
+            'INSERT INTO alerts (user_id, coin, target_price, is_greater_than, created_at) VALUES (?, ?, ?, ?, ?)',
+            (1, "bitcoin", 100000, True, created)
+        )
+        conn.execute('CREATE TABLE snapshots (id INTEGER PRIMARY KEY, kind TEXT, file TEXT, '
+                     'last_seq INTEGER, created_at REAL)')
+        conn.execute("INSERT INTO snapshots (kind, file, last_seq, created_at) "
+                     "VALUES ('full', 'alerts-20240101_000000_000000.db', 0, 0)")
+    makedirs(tmp_path / "snapshots")
+    (tmp_path / "snapshots" / "alerts-20240101_000000_000000.db").write_bytes(b"old schema")
+
+    db = Database(db_name)
+
+    with sqlite3.connect(db_name) as conn:
+        stored = conn.execute('SELECT created_at FROM alerts').fetchone()[0]
+        assert conn.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0] == 0
+    assert stored == int(time.mktime(created.timetuple()))
+    assert db.get_user_alerts(1)[0][1] == "bitcoin"
+
+    assert listdir(tmp_path / "snapshots") == ["pre-migration"]
+    assert listdir(tmp_path / "snapshots" / "pre-migration") == ["alerts-20240101_000000_000000.db"]
+    assert Snapshotter(db).latest_chain() == []
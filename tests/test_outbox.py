@@ -0,0 +1,210 @@
+import asyncio
+import sqlite3
+import sys
+import time
+import types
+
+import pytest
+
+from config import Config
+from database import Database
+
+TITLE = "🎯 Target(s) reached!\n\n"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "alerts.db"))
+
+
+def outbox(db):
+    with sqlite3.connect(db.db_name) as conn:
+        return conn.execute('SELECT user_id, text, status FROM outbox ORDER BY id').fetchall()
+
+
+def test_only_alerts_fired_by_this_transaction_are_notified(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    db.add_alert(1, "ethereum", 2000, True)
+    btc, eth = db.get_all_alerts()
+
+    # Another checker fires the bitcoin alert first
+    assert db.fire_alerts([(btc, "btc")], TITLE) == 1
+    assert db.fire_alerts([(btc, "btc"), (eth, "eth")], TITLE) == 1
+    assert db.fire_alerts([(btc, "btc"), (eth, "eth")], TITLE) == 0
+
+    assert outbox(db) == [(1, TITLE + "btc", "pending"), (1, TITLE + "eth", "pending")]
+    assert db.get_alerts_count(1) == 0
+
+
+def test_reused_alert_id_is_a_new_firing(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    (first,) = db.get_all_alerts()
+    assert db.fire_alerts([(first, "first")], TITLE) == 1
+
+    # Without AUTOINCREMENT the next alert gets the same id back
+    db.add_alert(1, "bitcoin", 100000, True)
+    (second,) = db.get_all_alerts()
+    assert second[0] == first[0]
+    assert db.fire_alerts([(second, "second")], TITLE) == 1
+    assert [text for _, text, _ in outbox(db)] == [TITLE + "first", TITLE + "second"]
+
+
+def test_stale_alert_row_is_not_fired(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    (read_by_checker,) = db.get_all_alerts()
+    db.remove_alert(read_by_checker[0], 1)
+    db.add_alert(1, "bitcoin", 90000, True)  # reuses the id
+
+    assert db.fire_alerts([(read_by_checker, "stale")], TITLE) == 0
+    assert db.get_alerts_count(1) == 1
+
+
+def test_outcomes_are_recorded_only_for_rows_still_claimed(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    db.add_alert(2, "bitcoin", 100000, True)
+    db.fire_alerts([(alert, "line") for alert in db.get_all_alerts()], TITLE)
+
+    batch = db.claim_outbox("a", 10, stale_after=60)
+    assert len(batch) == 2
+    # a's claim goes stale and b takes the rows over
+    assert db.claim_outbox("b", 10, stale_after=-1)
+    assert db.renew_outbox_claim("a", [row[0] for row in batch]) == 0
+
+    db.complete_outbox("a", [batch[0][0]], [], [batch[1][0]])
+    assert [status for _, _, status in outbox(db)] == ["sending", "sending"]
+
+    db.complete_outbox("b", [row[0] for row in batch], [], [])
+    assert [status for _, _, status in outbox(db)] == ["sent", "sent"]
+
+
+class TelegramRetryAfter(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TelegramForbiddenError(Exception):
+    pass
+
+
+class TelegramBadRequest(Exception):
+    pass
+
+
+class StubBot:
+    """Answers each send_message with the next scripted outcome"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = []
+
+    async def send_message(self, user_id, text, **kwargs):
+        self.sent.append(user_id)
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+
+
+@pytest.fixture
+def dispatcher_for(db, monkeypatch):
+    """Build an OutboxDispatcher with aiogram replaced by stubs"""
+    aiogram = types.ModuleType("aiogram")
+    aiogram.Bot = object
+    exceptions = types.ModuleType("aiogram.exceptions")
+    exceptions.TelegramRetryAfter = TelegramRetryAfter
+    exceptions.TelegramForbiddenError = TelegramForbiddenError
+    exceptions.TelegramBadRequest = TelegramBadRequest
+    aiogram_types = types.ModuleType("aiogram.types")
+    aiogram_types.InlineKeyboardButton = aiogram_types.InlineKeyboardMarkup = lambda **kwargs: None
+    for name, module in (("aiogram", aiogram), ("aiogram.exceptions", exceptions), ("aiogram.types", aiogram_types)):
+        monkeypatch.setitem(sys.modules, name, module)
+    for name in ("outbox", "keyboards"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    from outbox import OutboxDispatcher
+
+    class StubKeyboards:
+        def main_keyboard(self):
+            return None
+
+    def build(bot, max_attempts=3):
+        return OutboxDispatcher(db, bot, StubKeyboards(), "a", batch_size=10, max_attempts=max_attempts)
+    return build
+
+
+def queue(db, *user_ids, attempts=0):
+    with sqlite3.connect(db.db_name) as conn:
+        for user_id in user_ids:
+            conn.execute(
+                '''INSERT INTO outbox (idempotency_key, user_id, text, attempts, available_at, created_at)
+                   VALUES (?, ?, 'text', ?, 0, 0)''',
+                (f"{user_id}:test", user_id, attempts)
+            )
+
+
+def rows(db):
+    with sqlite3.connect(db.db_name) as conn:
+        return conn.execute(
+            'SELECT user_id, status, attempts, available_at, claimed_by FROM outbox ORDER BY id'
+        ).fetchall()
+
+
+def test_failed_send_is_retried_with_exponential_backoff(db, dispatcher_for):
+    queue(db, 1)
+    bot = StubBot(ConnectionError("timeout"), ConnectionError("timeout"))
+    dispatcher = dispatcher_for(bot)
+
+    before = time.time()
+    assert asyncio.run(dispatcher.drain()) == 1
+    (_, status, attempts, available_at, _), = rows(db)
+    assert (status, attempts) == ("pending", 1)
+    assert available_at == pytest.approx(before + Config.OUTBOX_RETRY_DELAY, abs=1)
+
+    with sqlite3.connect(db.db_name) as conn:
+        conn.execute('UPDATE outbox SET available_at = 0')
+    before = time.time()
+    asyncio.run(dispatcher.drain())
+    (_, status, attempts, available_at, _), = rows(db)
+    assert (status, attempts) == ("pending", 2)
+    assert available_at == pytest.approx(before + Config.OUTBOX_RETRY_DELAY * 2, abs=1)
+
+
+def test_send_fails_for_good_after_max_attempts(db, dispatcher_for):
+    queue(db, 1, attempts=2)
+    queue(db, 2)
+    bot = StubBot(ConnectionError("timeout"), TelegramForbiddenError("bot was blocked"))
+    asyncio.run(dispatcher_for(bot, max_attempts=3).drain())
+
+    assert [(user_id, status, attempts) for user_id, status, attempts, _, _ in rows(db)] == [
+        (1, "failed", 3),
+        (2, "failed", 1),  # blocked users are never retried
+    ]
+
+
+def test_flood_control_stops_the_batch_without_charging_untried_rows(db, dispatcher_for):
+    queue(db, 1, 2, 3)
+    bot = StubBot(None, TelegramRetryAfter(30))
+    before = time.time()
+    asyncio.run(dispatcher_for(bot).drain())
+
+    assert bot.sent == [1, 2]
+    (_, *first), (_, *second), (_, *third) = rows(db)
+    assert first[:2] == ["sent", 1]
+    assert second[:2] == ["pending", 1]
+    assert third[:2] == ["pending", 0]
+    assert second[2] == pytest.approx(before + 30, abs=1)
+    assert third[2] == pytest.approx(before + 30, abs=1)
+
+
+def test_dispatcher_stops_once_its_claim_is_lost(db, dispatcher_for):
+    queue(db, 1, 2)
+    # While the first message is sending, another instance takes the batch over
+    bot = StubBot(lambda: db.claim_outbox("b", 10, stale_after=-1))
+    asyncio.run(dispatcher_for(bot).drain())
+
+    assert bot.sent == [1]
+    # a's outcome isn't recorded over b's claim; b now owns both rows
+    assert [(status, claimed_by) for _, status, _, _, claimed_by in rows(db)] == [
+        ("sending", "b"), ("sending", "b")
+    ]
@@ -0,0 +1,57 @@
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket, TokenBuckets
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_spends_cost_and_refills_up_to_capacity(clock):
+    bucket = TokenBucket(capacity=10)
+    assert bucket.consume(4, rate=0.5, capacity=10)
+    assert bucket.consume(6, rate=0.5, capacity=10)
+    assert not bucket.consume(1, rate=0.5, capacity=10)
+
+    clock[0] += 4  # 2 tokens back
+    assert bucket.consume(2, rate=0.5, capacity=10)
+    assert not bucket.consume(1, rate=0.5, capacity=10)
+
+    clock[0] += 3600
+    assert bucket.consume(10, rate=0.5, capacity=10)
+    assert not bucket.consume(0.5, rate=0.5, capacity=10)
+
+
+def test_warning_and_cached_answer_once_per_throttled_stretch(clock):
+    bucket = TokenBucket(capacity=1)
+    assert bucket.consume(1, rate=1, capacity=1)
+
+    assert not bucket.consume(1, rate=1, capacity=1)
+    assert bucket.serve_cached_once()
+    assert bucket.warn_once()
+    assert not bucket.consume(1, rate=1, capacity=1)
+    assert not bucket.serve_cached_once()
+    assert not bucket.warn_once()
+
+    # An accepted request ends the stretch
+    clock[0] += 1
+    assert bucket.consume(1, rate=1, capacity=1)
+    assert not bucket.consume(1, rate=1, capacity=1)
+    assert bucket.serve_cached_once()
+    assert bucket.warn_once()
+
+
+def test_least_recently_seen_user_is_evicted(clock):
+    buckets = TokenBuckets(capacity=5, max_users=2)
+    first = buckets.get(1)
+    buckets.get(2)
+    assert buckets.get(1) is first  # 1 is now the most recent
+
+    buckets.get(3)
+    assert len(buckets) == 2
+    assert 2 not in buckets
+    assert 1 in buckets and 3 in buckets
@@ -0,0 +1,64 @@
+import sqlite3
+import time
+
+import pytest
+
+from database import Database
+
+TITLE = "🎯 Target(s) reached!\n\n"
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "alerts.db"))
+
+
+def state(db):
+    """(id, armed, threshold, ready_at) per alert"""
+    return [(row[0], row[5], row[6], row[7]) for row in db.get_all_alerts()]
+
+
+def test_one_time_alert_is_deleted_when_fired(db):
+    db.add_alert(1, "bitcoin", 100000, True)
+    (alert,) = db.get_all_alerts()
+    assert alert[5:] == (1, 100000, 0)  # armed, threshold, ready at once
+
+    assert db.fire_alerts([(alert, "line")], TITLE) == 1
+    assert db.get_all_alerts() == []
+
+
+@pytest.mark.parametrize("is_greater, threshold", [(True, 98.0), (False, 102.0)])
+def test_repeating_alert_is_disarmed_with_threshold_and_cooldown(db, is_greater, threshold):
+    db.add_alert(1, "bitcoin", 100, is_greater, hysteresis=0.02, cooldown=600)
+    (alert,) = db.get_all_alerts()
+
+    before = int(time.time())
+    assert db.fire_alerts([(alert, "line")], TITLE) == 1
+    ((alert_id, armed, rearm_at, ready_at),) = state(db)
+    assert armed == 0
+    # > alerts re-arm below the band, < alerts above it
+    assert rearm_at == pytest.approx(threshold)
+    assert before + 600 <= ready_at <= int(time.time()) + 600
+
+    # Firing a disarmed alert again changes nothing and queues nothing
+    (disarmed,) = db.get_all_alerts()
+    assert db.fire_alerts([(disarmed, "again")], TITLE) == 0
+
+
+def test_rearmed_alert_still_waits_for_its_cooldown(db):
+    db.add_alert(1, "bitcoin", 100, True, hysteresis=0.02, cooldown=600)
+    (alert,) = db.get_all_alerts()
+    db.fire_alerts([(alert, "line")], TITLE)
+    ((alert_id, _, _, ready_at),) = state(db)
+
+    assert db.rearm_alerts([alert_id])
+    assert state(db) == [(alert_id, 1, 100, ready_at)]
+    assert ready_at > time.time()
+
+    # Once the cooldown is over it fires again
+    with sqlite3.connect(db.db_name) as conn:
+        conn.execute('UPDATE alerts SET last_fired_at = last_fired_at - 600')
+    (rearmed,) = db.get_all_alerts()
+    assert rearmed[7] <= time.time()
+    assert db.fire_alerts([(rearmed, "line")], TITLE) == 1
+    assert state(db)[0][1] == 0
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+
+from scheduler import TickScheduler
+
+INTERVAL = 0.1
+TOLERANCE = 0.03
+
+
+def run_ticks(scheduler, count, work):
+    """Run `count` ticks, calling work(tick) in each; returns tick start offsets"""
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        offsets = []
+        async for tick in scheduler.ticks():
+            offsets.append(loop.time() - started)
+            work(tick)
+            if len(offsets) == count:
+                break
+        return offsets
+    return asyncio.run(scenario())
+
+
+def test_ticks_stay_on_the_grid_whatever_each_tick_takes():
+    scheduler = TickScheduler(INTERVAL)
+    # Varying work would drift a sleep-after-work loop by its total
+    offsets = run_ticks(scheduler, 6, lambda tick: time.sleep(0.02 * (tick % 3)))
+
+    for n, offset in enumerate(offsets):
+        assert offset == pytest.approx(n * INTERVAL, abs=TOLERANCE)
+    assert scheduler.overruns == 0
+    assert scheduler.missed_ticks == 0
+
+
+def test_overrun_merges_missed_ticks_and_rejoins_the_grid():
+    scheduler = TickScheduler(INTERVAL)
+    # Tick 1 runs for 2.5 intervals, past the deadlines at 2 and 3 intervals
+    offsets = run_ticks(scheduler, 5, lambda tick: time.sleep(2.5 * INTERVAL) if tick == 1 else None)
+
+    assert scheduler.overruns == 1
+    assert scheduler.missed_ticks == 1
+    assert offsets[0] == pytest.approx(0, abs=TOLERANCE)
+    assert offsets[1] == pytest.approx(INTERVAL, abs=TOLERANCE)
+    # The merged tick starts at once instead of queueing two ticks
+    assert offsets[2] == pytest.approx(3.5 * INTERVAL, abs=TOLERANCE)
+    # ...and the loop is back on the grid afterwards
+    assert offsets[3] == pytest.approx(4 * INTERVAL, abs=TOLERANCE)
+    assert offsets[4] == pytest.approx(5 * INTERVAL, abs=TOLERANCE)
+
+
+def test_long_tick_marks_the_scheduler_overloaded_until_a_quick_one():
+    scheduler = TickScheduler(INTERVAL, overload_ratio=0.5)
+    overloaded = []
+
+    def work(tick):
+        # Seen by tick N: whether tick N - 1 ran long
+        overloaded.append(scheduler.overloaded)
+        if tick == 1:
+            time.sleep(0.6 * INTERVAL)
+
+    run_ticks(scheduler, 4, work)
+    assert overloaded == [False, False, True, False]
+    assert scheduler.overruns == 0